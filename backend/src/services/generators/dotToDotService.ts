@@ -4,18 +4,27 @@
  * 2. 使用 Python 脚本处理成点对点图
  */
 
-import { spawn } from 'child_process';
 import * as fs from 'fs';
 import * as path from 'path';
 import { fileURLToPath } from 'url';
 import sharp from 'sharp';
 import { generateGeminiImage } from '../geminiImageService.js';
 import { cleanupFolder } from '../../utils/cacheManager.js';
+import { requestDotToDot, DotToDotEncoding, DOT_TO_DOT_ENCODINGS } from './dotToDotWorkerPool.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
 const DOTS_POINT_COUNT = Math.max(10, Math.min(60, Number(process.env.DOTS_POINT_COUNT) || 20));
+// 输出编码（默认 3 通道 PNG）；各编码的大小和耗时见 scripts/dot_to_dot_benchmark.py encoding
+const DOTS_ENCODING = parseEncoding(process.env.DOTS_ENCODING);
+
+function parseEncoding(value: string | undefined): DotToDotEncoding {
+    if (!value) return 'png';
+    if ((DOT_TO_DOT_ENCODINGS as readonly string[]).includes(value)) return value as DotToDotEncoding;
+    console.error(`[DotToDot] Invalid DOTS_ENCODING "${value}", expected one of ${DOT_TO_DOT_ENCODINGS.join('/')}; using png`);
+    return 'png';
+}
 
 // 固定万能模板（永远附加在提示词后面）
 const FIXED_TEMPLATE = 'simple clean black outline illustration, coloring book style, no color, no shading, no gray, no fill, no textures, smooth bold outline, child-friendly cute proportions, pure white background, no text, no numbers, no symbols, no extra elements, no background decorations, vertical composition, aspect ratio 3:4';
@@ -164,9 +173,11 @@ const THEME_IMAGE_DIRS: Record<string, string> = {
 
 /**
  * 调用 Gemini API 生成图片
- * 返回 { imagePath, characterName } 或 null
+ * 返回 { imagePath, imageBuffer, characterName } 或 null；简笔画在后台写入 sketches 目录作为备用
  */
-async function generateImageWithGemini(theme: string): Promise<{ imagePath: string; characterName: string } | null> {
+async function generateImageWithGemini(
+    theme: string
+): Promise<{ imagePath: string; imageBuffer: Buffer; characterName: string } | null> {
     // 标准化主题名
     const normalizedTheme = THEME_ALIASES[theme.toLowerCase()] || 'dinosaur';
     const { prompt, characterName } = generatePrompt(theme);
@@ -182,17 +193,19 @@ async function generateImageWithGemini(theme: string): Promise<{ imagePath: stri
         // 简笔画按主题分类存到 sketches/{theme}/ 文件夹
         const outputDir = path.join(__dirname, '../../../public/generated/sketches', normalizedTheme);
         const imagePath = path.join(outputDir, `sketch_${timestamp}.png`);
-        if (!fs.existsSync(outputDir)) {
-            fs.mkdirSync(outputDir, { recursive: true });
-        }
         const imageBuffer = Buffer.from(base64, 'base64');
-        fs.writeFileSync(imagePath, imageBuffer);
-        console.log(`[Imagen] Sketch saved: ${imagePath}`);
-        
-        // 清理旧缓存，每个主题只保留最新 20 张
-        cleanupFolder(outputDir, 20);
+
+        // 点对点处理直接使用内存中的图片字节，存盘不阻塞请求
+        fs.promises.mkdir(outputDir, { recursive: true })
+            .then(() => fs.promises.writeFile(imagePath, imageBuffer))
+            .then(() => {
+                console.log(`[Imagen] Sketch saved: ${imagePath}`);
+                // 清理旧缓存，每个主题只保留最新 20 张
+                cleanupFolder(outputDir, 20);
+            })
+            .catch((err) => console.error(`[Imagen] Failed to save sketch: ${err}`));
         
-        return { imagePath, characterName };
+        return { imagePath, imageBuffer, characterName };
     } catch (error) {
         console.error(`[Imagen] Error: ${error}`);
         return null;
@@ -283,111 +296,55 @@ function getRandomSketchImage(theme: string): string | null {
 }
 
 /**
- * 将 SVG 转换为 PNG（Python 的 cv2 不支持 SVG）
- * 使用系统临时目录，处理完后自动清理
+ * 将 SVG 转换为 PNG 字节（Python 的 cv2 不支持 SVG），直接通过 stdin 交给 Python，不落盘
  */
-async function convertSvgToPng(svgPath: string): Promise<string> {
-    const timestamp = Date.now();
-    const tempDir = path.join(process.env.TEMP || process.env.TMP || '/tmp', 'dot-to-dot');
-    const pngPath = path.join(tempDir, `svg_converted_${timestamp}.png`);
-    
-    if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
-    }
-    
+async function convertSvgToPng(svgPath: string): Promise<Buffer> {
     console.log(`[DotToDot] Converting SVG to PNG: ${svgPath}`);
     
     // 使用 sharp 将 SVG 转换为 PNG
-    await sharp(svgPath)
+    return sharp(svgPath)
         .resize(800, 800, { fit: 'inside', background: { r: 255, g: 255, b: 255, alpha: 1 } })
         .flatten({ background: { r: 255, g: 255, b: 255 } })
         .png()
-        .toFile(pngPath);
-    
-    console.log(`[DotToDot] SVG converted to PNG (temp): ${pngPath}`);
-    return pngPath;
+        .toBuffer();
 }
 
 /**
- * 删除临时文件（静默失败）
- */
-function cleanupTempFile(filePath: string): void {
-    try {
-        if (fs.existsSync(filePath)) {
-            fs.unlinkSync(filePath);
-            console.log(`[DotToDot] Cleaned up temp file: ${filePath}`);
-        }
-    } catch {
-        // 静默忽略清理失败
-    }
-}
-
-/**
- * 调用 Python 脚本处理点对点图，返回 base64 data URL（不落盘存储）
+ * 通过常驻 Python 进程处理点对点图，返回 base64 data URL（不落盘存储）
+ * 指定 targetCount 时输出恰好这么多个点（忽略角度阈值）
  */
 export async function processDotToDot(
-    inputPath: string,
+    input: string | Buffer,
     numPoints: number = 50,
-    angleThreshold: number = 20
+    angleThreshold: number = 20,
+    targetCount?: number
 ): Promise<string> {
-    // 如果是 SVG 文件，先转换为 PNG
-    let actualInputPath = inputPath;
-    let tempPngPath: string | null = null;
-
-    if (inputPath.toLowerCase().endsWith('.svg')) {
-        actualInputPath = await convertSvgToPng(inputPath);
-        tempPngPath = actualInputPath;
+    // 图片字节（或 SVG 转换后的 PNG 字节）随请求发给常驻进程，路径输入由 Python 直接读取
+    let imageBytes: Buffer | undefined;
+    if (Buffer.isBuffer(input)) {
+        imageBytes = input;
+    } else if (input.toLowerCase().endsWith('.svg')) {
+        imageBytes = await convertSvgToPng(input);
     }
 
-    return new Promise((resolve, reject) => {
-        const scriptPath = path.join(__dirname, '../../../../scripts/dot_to_dot.py');
-        const pythonPath = process.env.PYTHON_PATH || (process.platform === 'win32' ? 'python' : 'python3');
-
-        console.log(`[DotToDot] Processing (in-memory)...`);
-        console.log(`[DotToDot] Input: ${actualInputPath}`);
-
-        // 使用 --stdout 参数，输出 base64 到 stdout
-        const args = [scriptPath, actualInputPath, '--stdout', String(numPoints), String(angleThreshold)];
-        const proc = spawn(pythonPath, args);
-
-        let stdout = '';
-        let stderr = '';
-
-        proc.stdout.on('data', (data) => {
-            stdout += data.toString();
-        });
-
-        proc.stderr.on('data', (data) => {
-            stderr += data.toString();
-            // stderr 包含日志信息，打印出来
-            const lines = data.toString().trim().split('\n');
-            lines.forEach((line: string) => {
-                if (line.trim()) console.log(`[DotToDot] ${line}`);
-            });
-        });
-
-        proc.on('close', (code) => {
-            // 清理临时文件
-            if (tempPngPath) {
-                cleanupTempFile(tempPngPath);
-            }
-
-            if (code === 0 && stdout.trim()) {
-                const base64 = stdout.trim();
-                console.log(`[DotToDot] Done (${base64.length} chars)`);
-                resolve(`data:image/png;base64,${base64}`);
-            } else {
-                reject(new Error(`Python script failed (code=${code}): ${stderr}`));
-            }
-        });
-
-        proc.on('error', (err) => {
-            if (tempPngPath) {
-                cleanupTempFile(tempPngPath);
-            }
-            reject(new Error(`Cannot start Python: ${err.message}`));
-        });
-    });
+    console.log(`[DotToDot] Processing (in-memory)...`);
+    console.log(`[DotToDot] Input: ${imageBytes ? `<${imageBytes.length} bytes>` : input}`);
+
+    const result = await requestDotToDot({
+        num_points: numPoints,
+        angle_threshold: angleThreshold,
+        target_count: targetCount,
+        format: 'png',
+        encoding: DOTS_ENCODING,
+        metrics: true,
+        path: imageBytes ? undefined : (input as string),
+    }, imageBytes);
+
+    console.log(`[DotToDot] Done (${result.data.length} bytes${result.cached ? ', cached' : ''})`);
+    if (result.metrics) {
+        console.log(`[DotToDot] Metrics: ${JSON.stringify(result.metrics)}`);
+    }
+    return `data:${result.mime ?? 'image/png'};base64,${result.data.toString('base64')}`;
 }
 
 /**
@@ -411,6 +368,7 @@ export async function processDotToDotFromTheme(
     maxNumber: number = 20
 ): Promise<DotToDotResult> {
     let imagePath: string | null = null;
+    let imageBuffer: Buffer | null = null;
     let characterName: string = 'Animal';  // 默认名字
     
     // 1. 优先使用 Gemini API 生成
@@ -418,6 +376,7 @@ export async function processDotToDotFromTheme(
     const apiResult = await generateImageWithGemini(theme);
     if (apiResult) {
         imagePath = apiResult.imagePath;
+        imageBuffer = apiResult.imageBuffer;
         characterName = apiResult.characterName;
         console.log(`[DotToDot] Using Gemini API generated sketch: ${imagePath}`);
     }
@@ -460,10 +419,10 @@ export async function processDotToDotFromTheme(
     console.log(`[DotToDot] Final image: ${imagePath}`);
     console.log(`[DotToDot] Character name: ${characterName}`);
     
-    // 使用传入的 maxNumber 作为点数，如果未指定则使用环境变量
+    // 使用传入的 maxNumber 作为点数，如果未指定则使用环境变量；页面上的编号正好到这个数
     const numPoints = maxNumber || DOTS_POINT_COUNT;
     
-    const dotsImageUrl = await processDotToDot(imagePath, numPoints, 20);
+    const dotsImageUrl = await processDotToDot(imageBuffer ?? imagePath, numPoints, 20, numPoints);
     
     return { dotsImageUrl, characterName };
 }
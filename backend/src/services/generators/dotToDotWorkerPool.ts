@@ -0,0 +1,214 @@
+/**
+ * 点对点图 Python 常驻进程池
+ * 复用 `dot_to_dot.py --serve` 进程，避免每张图都冷启动 Python 并重新导入 cv2/numpy
+ *
+ * 协议：请求与响应都是「JSON 头帧 + 数据帧」，每帧为 4 字节大端长度 + 内容
+ */
+
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import * as os from 'os';
+import * as path from 'path';
+import { fileURLToPath } from 'url';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+const SCRIPT_PATH = path.resolve(__dirname, '../../../../scripts/dot_to_dot.py');
+const POOL_SIZE = Math.max(1, Math.min(8, Number(process.env.DOTS_WORKERS) || 2));
+const REQUEST_TIMEOUT_MS = 30000;
+// 同一张图 + 同样参数的结果缓存到磁盘（按输入内容哈希），主题素材反复出题时无需重新渲染
+const CACHE_DIR = process.env.DOTS_CACHE_DIR || path.join(os.tmpdir(), 'aikidprint-dots-cache');
+
+export const DOT_TO_DOT_ENCODINGS = ['png', 'gray', 'palette', 'webp'] as const;
+export type DotToDotEncoding = typeof DOT_TO_DOT_ENCODINGS[number];
+
+export interface DotToDotRequest {
+    num_points?: number;
+    angle_threshold?: number;
+    target_count?: number;
+    interpolate?: boolean;
+    // 直接按 [宽, 高] 画布分辨率居中绘制（低分辨率检测轮廓）
+    canvas?: [number, number];
+    padding?: number;
+    work_size?: number;
+    format?: 'png' | 'base64' | 'svg';
+    // 输出编码：3 通道 PNG / 灰度 + 编号颜色索引 PNG / 16 色索引 PNG / 无损 WebP
+    encoding?: DotToDotEncoding;
+    // PNG 压缩级别 0-9
+    compression?: number;
+    // 响应头附带各阶段耗时和 RSS 峰值
+    metrics?: boolean;
+    // 数据帧为空时由 Python 直接读取该文件
+    path?: string;
+}
+
+export interface DotToDotStageMetrics {
+    ms: number;
+    // 该阶段内 Python 进程的 RSS 峰值（阶段开始时重置 VmHWM；无 /proc 的平台为 null）
+    peak_rss_kb: number | null;
+}
+
+export interface DotToDotMetrics {
+    format: string;
+    image?: { width: number; height: number };
+    work?: { width: number; height: number };
+    output?: { width: number; height: number };
+    contour_length?: number;
+    sampled?: number;
+    dots?: number;
+    bytes?: number;
+    cached?: boolean;
+    total_ms: number;
+    stages: Record<string, DotToDotStageMetrics>;
+    // 本次请求开始、结束时的当前 RSS
+    start_rss_kb: number | null;
+    rss_kb: number | null;
+    // 本次请求各阶段 RSS 峰值中的最大值
+    peak_rss_kb: number | null;
+}
+
+export interface DotToDotResponse {
+    id: number;
+    ok: boolean;
+    format?: string;
+    mime?: string;
+    width?: number;
+    height?: number;
+    cached?: boolean;
+    metrics?: DotToDotMetrics;
+    error?: string;
+}
+
+export interface DotToDotWorkerResult extends DotToDotResponse {
+    data: Buffer;
+}
+
+interface PendingRequest {
+    resolve: (result: DotToDotWorkerResult) => void;
+    reject: (err: Error) => void;
+    timer: NodeJS.Timeout;
+}
+
+function frame(data: Buffer): Buffer {
+    const prefix = Buffer.alloc(4);
+    prefix.writeUInt32BE(data.length, 0);
+    return Buffer.concat([prefix, data]);
+}
+
+class DotToDotWorker {
+    private proc: ChildProcessWithoutNullStreams;
+    private pending = new Map<number, PendingRequest>();
+    private nextId = 1;
+    private buffer = Buffer.alloc(0);
+    private header: DotToDotResponse | null = null;
+    private fail: (err: Error) => void;
+    alive = true;
+
+    constructor(onExit: (worker: DotToDotWorker) => void) {
+        const pythonPath = process.env.PYTHON_PATH || (process.platform === 'win32' ? 'python' : 'python3');
+        this.proc = spawn(pythonPath, [SCRIPT_PATH, '--serve', '--cache-dir', CACHE_DIR]);
+
+        this.proc.stdout.on('data', (data: Buffer) => {
+            this.buffer = this.buffer.length ? Buffer.concat([this.buffer, data]) : data;
+            this.drain();
+        });
+
+        this.proc.stderr.on('data', (data) => {
+            const lines = data.toString().trim().split('\n');
+            lines.forEach((line: string) => {
+                if (line.trim()) console.log(`[DotToDot] ${line}`);
+            });
+        });
+
+        const fail = this.fail = (err: Error) => {
+            if (!this.alive) return;
+            this.alive = false;
+            for (const request of this.pending.values()) {
+                clearTimeout(request.timer);
+                request.reject(err);
+            }
+            this.pending.clear();
+            onExit(this);
+        };
+        this.proc.stdin.on('error', (err) => fail(new Error(`Dot-to-dot worker stdin: ${err.message}`)));
+        this.proc.on('error', (err) => fail(new Error(`Cannot start Python: ${err.message}`)));
+        this.proc.on('exit', (code) => fail(new Error(`Dot-to-dot worker exited (code=${code})`)));
+    }
+
+    /**
+     * 从缓冲区中取出完整的帧：先头帧，再数据帧
+     */
+    private drain(): void {
+        while (this.buffer.length >= 4) {
+            const length = this.buffer.readUInt32BE(0);
+            if (this.buffer.length < 4 + length) return;
+            const body = this.buffer.subarray(4, 4 + length);
+            this.buffer = this.buffer.subarray(4 + length);
+
+            if (!this.header) {
+                this.header = JSON.parse(body.toString('utf-8')) as DotToDotResponse;
+                continue;
+            }
+            const header = this.header;
+            this.header = null;
+            const request = this.pending.get(header.id);
+            if (!request) continue;
+            this.pending.delete(header.id);
+            clearTimeout(request.timer);
+            request.resolve({ ...header, data: Buffer.from(body) });
+        }
+    }
+
+    get load(): number {
+        return this.pending.size;
+    }
+
+    request(payload: DotToDotRequest, image?: Buffer): Promise<DotToDotWorkerResult> {
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error('Dot-to-dot worker timeout'));
+                // 卡住的进程不能留在池里：先标记失效（其余等待中的请求一并失败、移出进程池），再结束进程，
+                // 之后的请求由 pickWorker 按需新建进程
+                this.fail(new Error('Dot-to-dot worker restarted after a timeout'));
+                this.proc.kill();
+            }, REQUEST_TIMEOUT_MS);
+            this.pending.set(id, { resolve, reject, timer });
+            const header = Buffer.from(JSON.stringify({ ...payload, id }), 'utf-8');
+            this.proc.stdin.write(Buffer.concat([frame(header), frame(image ?? Buffer.alloc(0))]));
+        });
+    }
+}
+
+const workers: DotToDotWorker[] = [];
+
+function removeWorker(worker: DotToDotWorker): void {
+    const index = workers.indexOf(worker);
+    if (index >= 0) workers.splice(index, 1);
+}
+
+/**
+ * 选择负载最小的进程；池未满时新建进程（按需预热）
+ */
+function pickWorker(): DotToDotWorker {
+    const idle = workers.find((worker) => worker.load === 0);
+    if (idle) return idle;
+    if (workers.length < POOL_SIZE) {
+        const worker = new DotToDotWorker(removeWorker);
+        workers.push(worker);
+        return worker;
+    }
+    return workers.reduce((a, b) => (b.load < a.load ? b : a));
+}
+
+/**
+ * 通过常驻进程生成点对点图；image 为编码后的图片字节，省略时使用 payload.path
+ */
+export async function requestDotToDot(payload: DotToDotRequest, image?: Buffer): Promise<DotToDotWorkerResult> {
+    const result = await pickWorker().request(payload, image);
+    if (!result.ok) {
+        throw new Error(result.error || 'Dot-to-dot generation failed');
+    }
+    return result;
+}
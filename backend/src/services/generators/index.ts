@@ -1,5 +1,5 @@
 import { getRandomDecorImages, getThemeImages } from '../../utils/imageHelper.js';
-import { spawnSync } from 'child_process';
+import { requestMaze, MazeResponse } from './mazeWorkerPool.js';
 import fs from 'fs';
 import path from 'path';
 import { fileURLToPath } from 'url';
@@ -714,45 +714,60 @@ function buildLogicBlank(title: string, subtitle = '') {
 }
 
 /**
- * 生成迷宫图片，返回 SVG data URL（不落盘存储）
+ * 生成迷宫图片，返回 SVG data URL 和种子（不落盘存储）
+ * 通过常驻 Python 进程池生成，不阻塞事件循环；相同种子总是生成相同的迷宫
+ * answerKey 为 true 时同一次生成同时返回答案图
  */
-function generateMazeImage(difficulty: string = 'medium'): string | null {
+async function generateMazeImage(
+    difficulty: string = 'medium',
+    seed?: number,
+    answerKey: boolean = false
+): Promise<{ url: string; solutionUrl?: string; seed?: number } | null> {
     const allowed = ['easy', 'medium', 'hard'];
     const level = allowed.includes(difficulty) ? difficulty : 'medium';
     
-    const scriptPath = path.resolve(__dirname, '../../../../scripts/maze_generator.py');
-    const pythonPath = process.env.PYTHON_PATH || (process.platform === 'win32' ? 'python' : 'python3');
-    
     console.log(`[Maze] Generating ${level} maze (in-memory)...`);
 
-    // 使用 --stdout 参数，直接获取 SVG 内容
-    const result = spawnSync(pythonPath, [scriptPath, '-d', level, '--stdout'], { encoding: 'utf-8' });
-    
-    if (result.status !== 0) {
-        console.error('[Maze] python generate error:', result.stderr);
+    let svgContent: string;
+    let response: MazeResponse;
+    try {
+        response = await requestMaze({ difficulty: level, seed, answer_key: answerKey });
+        svgContent = (response.svg || '').trim();
+    } catch (err) {
+        console.error('[Maze] python generate error:', err);
         return null;
     }
     
-    const svgContent = result.stdout.trim();
     if (!svgContent || !svgContent.startsWith('<svg')) {
         console.error('[Maze] invalid SVG output');
         return null;
     }
     
     // 转为 base64 data URL
-    const base64 = Buffer.from(svgContent, 'utf-8').toString('base64');
-    console.log(`[Maze] Generated ${level} maze (${svgContent.length} chars)`);
+    const toDataUrl = (svg: string) => `data:image/svg+xml;base64,${Buffer.from(svg, 'utf-8').toString('base64')}`;
+    console.log(`[Maze] Generated ${level} maze (${svgContent.length} chars, seed=${response.seed}${response.cached ? ', cached' : ''})`);
     
-    return `data:image/svg+xml;base64,${base64}`;
+    return {
+        url: toDataUrl(svgContent),
+        solutionUrl: response.solution_svg ? toDataUrl(response.solution_svg.trim()) : undefined,
+        seed: response.seed
+    };
 }
 
 const generateMaze = async (config: any) => {
-    const { theme = 'dinosaur', difficulty = 'medium' } = config || {};
-    const mazeImageUrl = generateMazeImage(difficulty) || '';
+    const { theme = 'dinosaur', difficulty = 'medium', answerKey = false } = config || {};
+    const seed = Number.isInteger(config?.seed) ? config.seed : undefined;
+    const maze = await generateMazeImage(difficulty, seed, Boolean(answerKey));
     return {
         title: 'Maze',
         type: 'maze',
-        content: { theme, difficulty, mazeImageUrl }
+        content: {
+            theme,
+            difficulty,
+            mazeImageUrl: maze?.url || '',
+            mazeSolutionUrl: maze?.solutionUrl,
+            seed: maze?.seed
+        }
     };
 };
 
@@ -0,0 +1,150 @@
+/**
+ * 迷宫生成 Python 常驻进程池
+ * 复用 `maze_generator.py --serve` 进程，避免每页迷宫都冷启动 Python 并阻塞事件循环
+ */
+
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import * as os from 'os';
+import * as path from 'path';
+import * as readline from 'readline';
+import { fileURLToPath } from 'url';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+const SCRIPT_PATH = path.resolve(__dirname, '../../../../scripts/maze_generator.py');
+const POOL_SIZE = Math.max(1, Math.min(8, Number(process.env.MAZE_WORKERS) || 2));
+const REQUEST_TIMEOUT_MS = 15000;
+// 指定种子的迷宫 SVG 会缓存到磁盘，重复请求/重新下载时无需重新生成
+const CACHE_DIR = process.env.MAZE_CACHE_DIR || path.join(os.tmpdir(), 'aikidprint-maze-cache');
+
+export interface MazeRequest {
+    difficulty?: string;
+    size?: number;
+    algorithm?: string;
+    seed?: number;
+    cell_size?: number;
+    solution?: boolean;
+    answer_key?: boolean;
+    // 同一页排版多个迷宫：数量或逐个迷宫的参数
+    sheet?: number | Omit<MazeRequest, 'sheet'>[];
+}
+
+export interface MazeResponse {
+    id: number;
+    ok: boolean;
+    svg?: string;
+    solution_svg?: string;
+    size?: number;
+    algorithm?: string;
+    seed?: number;
+    cached?: boolean;
+    mazes?: { seed: number; size: number; metrics?: Record<string, number> }[];
+    error?: string;
+}
+
+interface PendingRequest {
+    resolve: (response: MazeResponse) => void;
+    reject: (err: Error) => void;
+    timer: NodeJS.Timeout;
+}
+
+class MazeWorker {
+    private proc: ChildProcessWithoutNullStreams;
+    private pending = new Map<number, PendingRequest>();
+    private nextId = 1;
+    private fail: (err: Error) => void;
+    alive = true;
+
+    constructor(onExit: (worker: MazeWorker) => void) {
+        const pythonPath = process.env.PYTHON_PATH || (process.platform === 'win32' ? 'python' : 'python3');
+        this.proc = spawn(pythonPath, [SCRIPT_PATH, '--serve', '--cache-dir', CACHE_DIR]);
+
+        // 每行一个 JSON 响应
+        readline.createInterface({ input: this.proc.stdout }).on('line', (line) => {
+            let response: MazeResponse;
+            try {
+                response = JSON.parse(line);
+            } catch {
+                console.error('[Maze] invalid worker output:', line.slice(0, 200));
+                return;
+            }
+            const request = this.pending.get(response.id);
+            if (!request) return;
+            this.pending.delete(response.id);
+            clearTimeout(request.timer);
+            request.resolve(response);
+        });
+
+        this.proc.stderr.on('data', (data) => {
+            console.error(`[Maze] worker: ${data.toString().trim()}`);
+        });
+
+        const fail = this.fail = (err: Error) => {
+            if (!this.alive) return;
+            this.alive = false;
+            for (const request of this.pending.values()) {
+                clearTimeout(request.timer);
+                request.reject(err);
+            }
+            this.pending.clear();
+            onExit(this);
+        };
+        // 进程已退出时写 stdin 会触发 EPIPE，不处理会让整个 Node 进程崩溃
+        this.proc.stdin.on('error', (err) => fail(new Error(`Maze worker stdin: ${err.message}`)));
+        this.proc.on('error', (err) => fail(new Error(`Cannot start Python: ${err.message}`)));
+        this.proc.on('exit', (code) => fail(new Error(`Maze worker exited (code=${code})`)));
+    }
+
+    get load(): number {
+        return this.pending.size;
+    }
+
+    request(payload: MazeRequest): Promise<MazeResponse> {
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error('Maze worker timeout'));
+                // 卡住的进程不能留在池里：先标记失效（其余等待中的请求一并失败、移出进程池），再结束进程，
+                // 之后的请求由 pickWorker 按需新建进程
+                this.fail(new Error('Maze worker restarted after a timeout'));
+                this.proc.kill();
+            }, REQUEST_TIMEOUT_MS);
+            this.pending.set(id, { resolve, reject, timer });
+            this.proc.stdin.write(JSON.stringify({ ...payload, id }) + '\n');
+        });
+    }
+}
+
+const workers: MazeWorker[] = [];
+
+function removeWorker(worker: MazeWorker): void {
+    const index = workers.indexOf(worker);
+    if (index >= 0) workers.splice(index, 1);
+}
+
+/**
+ * 选择负载最小的进程；池未满时新建进程（按需预热）
+ */
+function pickWorker(): MazeWorker {
+    const idle = workers.find((worker) => worker.load === 0);
+    if (idle) return idle;
+    if (workers.length < POOL_SIZE) {
+        const worker = new MazeWorker(removeWorker);
+        workers.push(worker);
+        return worker;
+    }
+    return workers.reduce((a, b) => (b.load < a.load ? b : a));
+}
+
+/**
+ * 通过常驻进程生成迷宫 SVG
+ */
+export async function requestMaze(payload: MazeRequest): Promise<MazeResponse> {
+    const response = await pickWorker().request(payload);
+    if (!response.ok) {
+        throw new Error(response.error || 'Maze generation failed');
+    }
+    return response;
+}
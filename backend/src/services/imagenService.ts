@@ -22,15 +22,23 @@ const THEME_PROMPTS: Record<string, string> = {
 };
 
 /**
- * 调用 Gemini API 生成图片
+ * 调用 Gemini API 生成图片，返回图片字节
  */
-export async function generateImageWithGemini(theme: string = 'dinosaur'): Promise<string> {
+async function generateImageBuffer(theme: string): Promise<Buffer> {
     const prompt = THEME_PROMPTS[theme.toLowerCase()] || THEME_PROMPTS.dinosaur;
     console.log(`[Imagen] 正在生成 ${theme} 主题图片... (Gemini API)`);
 
     const base64Data = await generateGeminiImage(prompt, { temperature: 0.4 });
 
     console.log(`[Imagen] 图片生成成功`);
+    return Buffer.from(base64Data, 'base64');
+}
+
+/**
+ * 调用 Gemini API 生成图片并保存到 sketches 文件夹
+ */
+export async function generateImageWithGemini(theme: string = 'dinosaur'): Promise<string> {
+    const imageBuffer = await generateImageBuffer(theme);
     
     // 简笔画存到 sketches 文件夹
     const timestamp = Date.now();
@@ -42,8 +50,6 @@ export async function generateImageWithGemini(theme: string = 'dinosaur'): Promi
         fs.mkdirSync(outputDir, { recursive: true });
     }
     
-    // 解码并保存
-    const imageBuffer = Buffer.from(base64Data, 'base64');
     fs.writeFileSync(originalPath, imageBuffer);
     console.log(`[Imagen] 简笔画已保存: ${originalPath}`);
     
@@ -52,9 +58,10 @@ export async function generateImageWithGemini(theme: string = 'dinosaur'): Promi
 
 /**
  * 调用 Python 脚本处理点对点图
+ * input 为图片字节时通过 stdin 传入，不写临时文件
  */
 export async function processDotToDot(
-    inputPath: string, 
+    input: string | Buffer, 
     numPoints: number = 50, 
     angleThreshold: number = 20
 ): Promise<string> {
@@ -69,12 +76,17 @@ export async function processDotToDot(
         const pythonPath = process.env.PYTHON_PATH || 'python';
         
         console.log(`[DotToDot] 正在处理点对点图...`);
-        console.log(`[DotToDot] 输入: ${inputPath}`);
+        const inputArg = Buffer.isBuffer(input) ? '-' : input;
+        console.log(`[DotToDot] 输入: ${Buffer.isBuffer(input) ? `<stdin ${input.length} bytes>` : input}`);
         console.log(`[DotToDot] 输出: ${outputPath}`);
         
-        const args = [scriptPath, inputPath, outputPath, String(numPoints), String(angleThreshold)];
+        const args = [scriptPath, inputArg, outputPath, String(numPoints), String(angleThreshold)];
         
         const proc = spawn(pythonPath, args);
+        proc.stdin.on('error', () => {
+            // Python 提前退出时写 stdin 会 EPIPE，错误由 close 事件处理
+        });
+        proc.stdin.end(Buffer.isBuffer(input) ? input : undefined);
         
         let stdout = '';
         let stderr = '';
@@ -114,10 +126,10 @@ export async function generateConnectDotsImage(
 ): Promise<string> {
     try {
         // 步骤1: 调用 API 生成简笔画
-        const originalPath = await generateImageWithGemini(theme);
+        const imageBuffer = await generateImageBuffer(theme);
         
-        // 步骤2: 处理成点对点图
-        const dotsPath = await processDotToDot(originalPath, numPoints, angleThreshold);
+        // 步骤2: 处理成点对点图（图片字节直接通过 stdin 传入）
+        const dotsPath = await processDotToDot(imageBuffer, numPoints, angleThreshold);
         
         // 步骤3: 保存到云存储或返回本地路径
         const filename = path.basename(dotsPath);
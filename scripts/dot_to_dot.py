@@ -4,10 +4,42 @@
 保留拐角处的点，删除直线部分的点
 
 使用方法:
-    python scripts/dot_to_dot.py <输入图片路径> [输出图片路径] [点数量] [角度阈值]
+    python scripts/dot_to_dot.py <输入图片路径> [输出图片路径] [点数量] [角度阈值] [--target-count N]
+
+    输出路径为 - （或旧写法 --stdout）时以 base64 输出到 stdout；
+    再加 --binary 则输出 4 字节大端长度 + PNG 字节（免去 base64 膨胀）
+    输入路径为 - 时从 stdin 读取编码后的图片字节（免去临时文件）
+    --target-count N: 精确输出 N 个点，依次删除最平直的点（适合 10/20/50/100 点的分龄页面）
+    --canvas WxH: 在低分辨率上检测轮廓，直接按画布分辨率居中绘制（省去放大 + 二次缩放）
+    --svg（或输出路径以 .svg 结尾）: 输出 SVG，线稿内嵌为灰度 PNG，圆点和编号为 <circle>/<text>
+    --batch: 输入为目录或 glob、输出为目录，在线程池中批量生成（-j 线程数，输出比输入新时跳过，--force 强制）
+    --encoding png|gray|palette|webp, --compression 0-9: 输出编码（见 ENCODINGS）和 PNG 压缩级别
+    --metrics json: 结束时向 stderr 输出一行 JSON：各阶段（read / decode / resize / threshold / contours /
+        resample / filter / fade / draw / encode / write）的耗时和阶段内 RSS 峰值，以及图片尺寸、轮廓长度、点数
 
 示例:
     python scripts/dot_to_dot.py docs/ki.png output.png 30 20
+    python scripts/dot_to_dot.py docs/ki.png output.png --target-count 20
+    python scripts/dot_to_dot.py docs/ki.png output.png --canvas 678x900
+    python scripts/dot_to_dot.py docs/ki.png output.svg --canvas 678x900
+    python scripts/dot_to_dot.py --batch "backend/public/uploads/bigpng/*.png" /tmp/dots -t 20 -j 4
+    cat docs/ki.png | python scripts/dot_to_dot.py - - --binary > dots.bin
+    python scripts/dot_to_dot.py --serve
+    python scripts/dot_to_dot.py --socket /tmp/dot_to_dot.sock
+
+结果缓存（--cache-dir 或环境变量 DOTS_CACHE_DIR）:
+    以输入图片字节的 SHA-256 + 渲染参数为键缓存最终 PNG，多个进程可共享同一目录
+
+常驻模式（--serve / --socket）:
+    请求: 头帧 + 数据帧；每帧为 4 字节大端长度 + 内容
+        头帧 JSON: {"id": 1, "num_points": 50, "angle_threshold": 20, "target_count": 20,
+                    "canvas": [678, 900], "padding": 40, "work_size": 800,
+                    "format": "png" | "base64" | "svg", "encoding": "palette", "compression": 9,
+                    "metrics": true, "path": "可选，数据帧为空时读取该文件"}
+        数据帧: 编码后的图片字节（PNG/JPEG 等）
+    响应: 头帧 {"id": 1, "ok": true, "format": "png", "mime": "image/png", "width": .., "height": .., "cached": false}
+        + 结果数据帧；失败时 {"id": 1, "ok": false, "error": "..."} + 空数据帧
+    头帧为 {"stats": true} 时返回缓存命中/未命中计数
 """
 
 import cv2
@@ -15,6 +47,120 @@ import numpy as np
 import sys
 import os
 import math
+import heapq
+import json
+import struct
+import base64
+import hashlib
+import argparse
+import io
+import re
+import time
+import glob
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from result_cache import ResultCache
+
+# 渲染结果变化时递增，旧缓存随之失效
+PIPELINE_VERSION = 4
+
+
+def current_rss_kb() -> Optional[int]:
+    """当前常驻内存（KiB），读取 /proc/self/statm；没有 /proc 的平台返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def reset_peak_rss() -> bool:
+    """把进程的 RSS 峰值（VmHWM）重置为当前 RSS（Linux 的 /proc/self/clear_refs），不支持时返回 False"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_kb() -> Optional[int]:
+    """上次 reset_peak_rss 以来的 RSS 峰值（KiB），读取 /proc/self/status 的 VmHWM；没有 /proc 的平台返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class RunMetrics(dict):
+    """
+    一次渲染的结构化指标（--metrics json）
+    
+    本身是 {阶段: 秒} 的 dict，可以直接作为 timings 传入各函数；
+    另外记录每个阶段内的 RSS 峰值（阶段开始时重置 VmHWM，结束时读取；同名阶段取最大值），
+    以及图片尺寸、轮廓长度、点数等附加信息。
+    记录中的 start_rss_kb / rss_kb 为开始、结束时的当前 RSS，peak_rss_kb 为各阶段峰值中的最大值；
+    阶段之间的少量代码不计入峰值。不支持 /proc 的平台这些字段为 None。
+    阶段峰值按进程测量，只适用于同一时间只有一次渲染的场景（CLI、常驻模式）。
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.peak_rss_kb = {}
+        self.info = {}
+        self.start_rss_kb = current_rss_kb()
+        self.start = time.perf_counter()
+    
+    def record(self, **fields) -> dict:
+        """整理成可直接 json.dumps 的记录（阶段按执行顺序）"""
+        peaks = [peak for peak in self.peak_rss_kb.values() if peak is not None]
+        return {
+            **fields,
+            **self.info,
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'stages': {name: {'ms': round(seconds * 1000, 3), 'peak_rss_kb': self.peak_rss_kb.get(name)}
+                       for name, seconds in self.items()},
+            'start_rss_kb': self.start_rss_kb,
+            'rss_kb': current_rss_kb(),
+            'peak_rss_kb': max(peaks) if peaks else None,
+        }
+
+
+def note_metrics(timings: Optional[dict], **values):
+    """timings 为 RunMetrics 时记录附加信息"""
+    if isinstance(timings, RunMetrics):
+        timings.info.update(values)
+
+
+@contextlib.contextmanager
+def stage_timer(timings: Optional[dict], name: str):
+    """
+    把 with 块的耗时（秒）累加到 timings[name]；timings 为 None 时不计时，
+    为 RunMetrics 时同时记下该阶段内的 RSS 峰值
+    """
+    if timings is None:
+        yield
+        return
+    measure_peak = isinstance(timings, RunMetrics) and reset_peak_rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        if isinstance(timings, RunMetrics):
+            # 无法重置时 VmHWM 是进程累计峰值，不代表该阶段，记为 None
+            peak = peak_rss_kb() if measure_peak else None
+            previous = timings.peak_rss_kb.get(name)
+            timings.peak_rss_kb[name] = peak if previous is None or peak is None else max(previous, peak)
 
 
 def angle_between_points(p1, p2):
@@ -46,278 +192,1102 @@ def filter_points_on_angle(points, angle_threshold=20):
     if len(points) < 3:
         return points
     
-    excluded_indices = set()
-    i = 0
-    while i < len(points) - 2:
-        p1 = points[i]
-        p2 = points[i + 1]
-        p3 = points[i + 2]
+    # 一次算出所有内部点 p1-p2-p3 的夹角（公式同 angle_at_point）
+    pts = np.asarray(points, dtype=np.float64)
+    incoming = pts[1:-1] - pts[:-2]
+    outgoing = pts[1:-1] - pts[2:]
+    angles = rad_to_deg(np.abs(np.arctan2(incoming[:, 1], incoming[:, 0])
+                               - np.arctan2(outgoing[:, 1], outgoing[:, 0])))
+    straight = np.abs(180 - angles) < angle_threshold
+    
+    # 从左到右删点时会跳过被删点之后的一个三元组，
+    # 所以每段连续的「直线」中只删第 1、3、5... 个
+    positions = np.arange(len(straight))
+    run_start = straight & ~np.concatenate(([False], straight[:-1]))
+    run_offset = positions - np.maximum.accumulate(np.where(run_start, positions, 0))
+    excluded = straight & (run_offset % 2 == 0)
+    
+    keep = np.flatnonzero(~np.concatenate(([False], excluded, [False])))
+    return [points[i] for i in keep]
+
+
+def _triangle_area(p1, p2, p3) -> float:
+    """p1-p2-p3 三角形面积：越小说明 p2 越平直（或离邻点越近）"""
+    return abs((p2[0] - p1[0]) * (p3[1] - p2[1]) - (p2[1] - p1[1]) * (p3[0] - p2[0])) / 2
+
+
+def reduce_to_count(points, target_count: int) -> list:
+    """
+    精确保留 target_count 个点：每次删除最平直的点，直到点数达标
+    
+    平直程度用该点与两侧邻点围成的三角形面积衡量（Visvalingam），
+    既优先删除直线上的点，也会合并拐角两侧挤在一起的点。
+    点序列视为闭合轮廓（首尾相邻）。所有面积先一次算出放进小根堆，
+    删点后只重算两侧邻居（旧堆项按版本号作废），整体 O(n log n)。
+    """
+    n = len(points)
+    if target_count >= n:
+        return list(points)
+    if target_count <= 0:
+        return []
+    
+    pts = np.asarray(points, dtype=np.float64)
+    incoming = pts - np.roll(pts, 1, axis=0)
+    outgoing = np.roll(pts, -1, axis=0) - pts
+    areas = np.abs(incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0]) / 2
+    
+    heap = [(area, i, 0) for i, area in enumerate(areas.tolist())]
+    heapq.heapify(heap)
+    coords = pts.tolist()
+    prev = [(i - 1) % n for i in range(n)]
+    next_ = [(i + 1) % n for i in range(n)]
+    version = [0] * n
+    removed = [False] * n
+    
+    remaining = n
+    while remaining > target_count:
+        _, i, v = heapq.heappop(heap)
+        if removed[i] or v != version[i]:
+            continue
+        removed[i] = True
+        remaining -= 1
+        before, after = prev[i], next_[i]
+        next_[before], prev[after] = after, before
+        for j in (before, after):
+            version[j] += 1
+            area = _triangle_area(coords[prev[j]], coords[j], coords[next_[j]])
+            heapq.heappush(heap, (area, j, version[j]))
+    
+    return [p for i, p in enumerate(points) if not removed[i]]
+
+
+def select_points(contour_points, num_points: int = 50, angle_threshold: int = 20,
+                  target_count: int = None, interpolate: bool = False, timings: Optional[dict] = None):
+    """
+    从轮廓上选出编号点，返回 (均匀采样点, 最终点)
+    
+    target_count 为空时：均匀采样 num_points 个点后做两遍角度过滤，
+    剩余点过少时从采样点中精简出 max(10, num_points // 5) 个；
+    指定 target_count 时：按 max(num_points, 2 * target_count) 采样，再精简到恰好 target_count 个点。
+    timings 不为空时把 resample / filter 两个阶段的耗时累加进去（见 stage_timer）。
+    """
+    if target_count:
+        with stage_timer(timings, 'resample'):
+            sampled_points = resample_contour(contour_points, max(num_points, 2 * target_count), interpolate)
+        with stage_timer(timings, 'filter'):
+            return sampled_points, reduce_to_count(sampled_points, target_count)
+    
+    with stage_timer(timings, 'resample'):
+        sampled_points = resample_contour(contour_points, num_points, interpolate)
+    with stage_timer(timings, 'filter'):
+        filtered_points = sampled_points
+        for _ in range(2):
+            filtered_points = filter_points_on_angle(filtered_points, angle_threshold)
         
-        angle = rad_to_deg(angle_at_point(p1, p2, p3))
-        # 如果角度接近 180°（直线），删除中间点
-        if abs(180 - angle) < angle_threshold:
-            excluded_indices.add(i + 1)
-            i += 1  # 跳过被删除的点
-        i += 1
+        # 确保至少保留一定数量的点
+        min_points = max(10, num_points // 5)
+        if len(filtered_points) < min_points:
+            filtered_points = reduce_to_count(sampled_points, min_points)
+    return sampled_points, filtered_points
+
+
+def resample_contour(contour_points, num_points: int, interpolate: bool = False) -> list:
+    """
+    沿闭合轮廓按弧长均匀采样 num_points 个点
+    
+    一次 diff/hypot/cumsum 得到累计弧长，所有目标弧长用一次 searchsorted 查找。
+    interpolate=False 时取累计弧长不小于目标值的第一个轮廓顶点（与旧版逐点循环结果一致）；
+    interpolate=True 时在所在线段上线性插值，返回浮点坐标。
+    """
+    points = np.asarray(contour_points).reshape(-1, 2)
+    if len(points) == 0 or num_points <= 0:
+        return []
     
-    return [p for i, p in enumerate(points) if i not in excluded_indices]
+    # 含首尾闭合段；总长沿用 cv2.arcLength（单精度逐段开方），保证取点与旧版完全一致
+    closed = np.vstack([points, points[:1]]).astype(np.float64)
+    segments = np.hypot(*np.diff(closed, axis=0).T)
+    cumulative = np.concatenate(([0.0], np.cumsum(segments)))
+    total_length = cv2.arcLength(closed[:-1, None, :].astype(np.float32), closed=True)
+    targets = np.arange(num_points) * (total_length / num_points)
+    
+    if not interpolate:
+        indices = np.minimum(np.searchsorted(cumulative[:-1], targets), len(points) - 1)
+        return points[indices].tolist()
+    
+    indices = np.clip(np.searchsorted(cumulative, targets, side='right') - 1, 0, len(points) - 1)
+    lengths = segments[indices]
+    fraction = np.divide(targets - cumulative[indices], lengths,
+                         out=np.zeros_like(targets), where=lengths > 0)
+    sampled = closed[indices] + fraction[:, None] * (closed[indices + 1] - closed[indices])
+    return sampled.tolist()
 
 
-def generate_dot_to_dot(input_path: str, output_path: str = None, 
-                        num_points: int = 50, angle_threshold: int = 20):
+def fade_outer_contour(output, gray, contour, thickness: int = 30, color: int = 230):
     """
-    将黑白线稿转换为点对点连线图
+    把外轮廓附近（宽 thickness 的窄带）的深色像素淡化为 color，内部线条保持原色
     
-    Args:
-        input_path: 输入图片路径
-        output_path: 输出图片路径
-        num_points: 初始采样点数量
-        angle_threshold: 角度过滤阈值（越小保留的点越少）
+    只在轮廓外接矩形（四周留出半个线宽）的视图上分配掩码和赋值，原地修改 output
     """
-    # 读取图片
-    img = cv2.imread(input_path)
-    if img is None:
-        print(f"[ERROR] Cannot read image: {input_path}")
-        return None
+    x, y, w, h = cv2.boundingRect(contour)
+    margin = thickness // 2 + 1
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1 = min(gray.shape[1], x + w + margin)
+    y1 = min(gray.shape[0], y + h + margin)
     
-    # 放大图片到目标尺寸（至少 800x800），保持比例
-    target_size = 800
+    outer_mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    cv2.drawContours(outer_mask, [contour], -1, 255, thickness=thickness, offset=(-x0, -y0))
+    output[y0:y1, x0:x1][(outer_mask == 255) & (gray[y0:y1, x0:x1] < 200)] = color
+    return output
+
+
+def _find_main_contour(gray, timings: Optional[dict] = None):
+    """二值化后取面积最大的外轮廓，找不到时返回 None"""
+    with stage_timer(timings, 'threshold'):
+        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+    with stage_timer(timings, 'contours'):
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        if not contours:
+            return None
+        return max(contours, key=cv2.contourArea)
+
+
+def _resize(img, width: int, height: int):
+    """
+    缩放图片：放大用 INTER_CUBIC；缩小时先按整数倍 INTER_AREA（OpenCV 的快速路径），
+    余下不足 2 倍的部分用 INTER_LINEAR。任意倍率的 INTER_AREA 比这样慢约 5 倍，而结果几乎一致
+    """
+    h, w = img.shape[:2]
+    if width >= w and height >= h:
+        return cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC)
+    factor = int(min(w / width, h / height))
+    if factor >= 2:
+        img = cv2.resize(img, (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+    return cv2.resize(img, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def _fit_canvas(img, canvas, padding: int):
+    """把 img 等比缩放后居中放到四周留白 padding 的白色画布上，返回 (画布, 缩放比例, 偏移)"""
+    canvas_w, canvas_h = canvas
+    if padding < 0 or padding * 2 >= min(canvas_w, canvas_h):
+        raise ValueError(f'padding {padding} does not fit canvas {canvas_w}x{canvas_h}')
     h, w = img.shape[:2]
-    if max(h, w) < target_size:
-        scale = target_size / max(h, w)
-        new_w = int(w * scale)
-        new_h = int(h * scale)
-        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-        print(f"   - 图片放大: {w}x{h} -> {new_w}x{new_h}")
+    scale = min((canvas_w - padding * 2) / w, (canvas_h - padding * 2) / h)
+    new_w, new_h = int(w * scale), int(h * scale)
     
-    # 转灰度
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    output = np.full((canvas_h, canvas_w, 3), 255, dtype=np.uint8)
+    x_offset = (canvas_w - new_w) // 2
+    y_offset = (canvas_h - new_h) // 2
+    output[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = _resize(img, new_w, new_h)
+    return output, scale, (x_offset, y_offset)
+
+
+def prepare_dot_to_dot(img, num_points: int = 50, angle_threshold: int = 20,
+                       target_count: int = None, interpolate: bool = False, log=None,
+                       inplace: bool = False, canvas=None, padding: int = 40, work_size: int = 800,
+                       timings: Optional[dict] = None):
+    """
+    找最大外轮廓、选点并淡化外轮廓，返回 (底图, 编号点坐标)；找不到轮廓时返回 None
     
-    # 二值化
-    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+    canvas 为空时在输入分辨率上处理（小于 work_size 的图先放大到 work_size）；
+    指定 canvas=(宽, 高) 时轮廓检测和选点在最长边为 work_size 的工作分辨率上完成，
+    坐标换算到画布后，淡化和绘制直接在最终画布上进行（原图只缩放一次）。
+    timings 不为空时按阶段累加耗时（秒）：resize / threshold / contours / resample / filter / fade。
+    """
+    log = log or sys.stderr
+    h, w = img.shape[:2]
     
-    # 查找轮廓
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    with stage_timer(timings, 'resize'):
+        if canvas:
+            work_scale = work_size / max(h, w)
+            work = _resize(img, round(w * work_scale), round(h * work_scale))
+            print(f"   - 工作分辨率: {w}x{h} -> {work.shape[1]}x{work.shape[0]}", file=log)
+        else:
+            # 放大图片到目标尺寸（至少 800x800），保持比例
+            work_scale = 1
+            work = img
+            if max(h, w) < work_size:
+                scale = work_size / max(h, w)
+                new_w = int(w * scale)
+                new_h = int(h * scale)
+                work = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
+                print(f"   - 图片放大: {w}x{h} -> {new_w}x{new_h}", file=log)
     
-    if not contours:
-        print("[ERROR] No contours found")
+    with stage_timer(timings, 'threshold'):
+        gray = cv2.cvtColor(work, cv2.COLOR_BGR2GRAY)
+    main_contour = _find_main_contour(gray, timings)
+    note_metrics(timings, image={'width': w, 'height': h},
+                 work={'width': work.shape[1], 'height': work.shape[0]},
+                 contour_length=0 if main_contour is None else len(main_contour))
+    if main_contour is None:
         return None
     
-    # 找最大轮廓
-    main_contour = max(contours, key=cv2.contourArea)
-    contour_points = main_contour.reshape(-1, 2)
-    
-    # 计算轮廓总长度
-    total_length = cv2.arcLength(main_contour, closed=True)
-    
-    # 步骤1: 沿轮廓均匀采样
-    cumulative_length = [0]
-    for i in range(1, len(contour_points)):
-        dist = np.linalg.norm(contour_points[i] - contour_points[i-1])
-        cumulative_length.append(cumulative_length[-1] + dist)
-    cumulative_length = np.array(cumulative_length)
-    
-    # 均匀采样
-    step = total_length / num_points
-    sampled_points = []
-    for i in range(num_points):
-        target_length = i * step
-        idx = np.searchsorted(cumulative_length, target_length)
-        idx = min(idx, len(contour_points) - 1)
-        sampled_points.append(contour_points[idx].tolist())
-    
-    # 步骤2: 角度过滤（重复2次，适度精简）
-    filtered_points = sampled_points
-    for _ in range(2):
-        filtered_points = filter_points_on_angle(filtered_points, angle_threshold)
-    
-    # 确保至少保留一定数量的点
-    min_points = max(10, num_points // 5)
-    if len(filtered_points) < min_points:
-        # 如果点数太少，使用均匀采样的结果
-        step = len(sampled_points) // min_points
-        filtered_points = sampled_points[::step][:min_points]
-    
-    print(f"   - 初始采样: {num_points} 点")
-    print(f"   - 角度过滤后: {len(filtered_points)} 点")
-    
-    # 创建输出图片 - 复制原图保留内部细节
-    output = img.copy()
-    
-    # 创建外轮廓区域的 mask（只包含轮廓线附近的窄带）
-    outer_mask = np.zeros(gray.shape, dtype=np.uint8)
-    cv2.drawContours(outer_mask, [main_contour], -1, 255, thickness=30)
-    
-    # 颜色设置：只处理外轮廓，内部线条保持原色
-    outer_faint_color = 230  # 外轮廓 - 非常淡
-    
-    for y in range(output.shape[0]):
-        for x in range(output.shape[1]):
-            # 只处理外轮廓区域的深色像素
-            if outer_mask[y, x] == 255 and gray[y, x] < 200:
-                output[y, x] = [outer_faint_color, outer_faint_color, outer_faint_color]
-            # 内部线条保持原图颜色不变
+    # 步骤1: 沿轮廓均匀采样；步骤2: 角度过滤或精简到目标点数
+    sampled_points, filtered_points = select_points(main_contour.reshape(-1, 2), num_points, angle_threshold,
+                                                    target_count, interpolate, timings)
+    
+    print(f"   - 初始采样: {len(sampled_points)} 点", file=log)
+    print(f"   - 角度过滤后: {len(filtered_points)} 点", file=log)
+    note_metrics(timings, sampled=len(sampled_points), dots=len(filtered_points))
+    
+    if not canvas:
+        # 在原图上绘制以保留内部细节；放大后的 work 本就是新数组，无需再复制
+        output = work if inplace or work is not img else img.copy()
+        # 只淡化外轮廓（非常淡），内部线条保持原色
+        with stage_timer(timings, 'fade'):
+            fade_outer_contour(output, gray, main_contour)
+        return output, filtered_points
+    
+    # 工作分辨率坐标 -> 画布坐标；画布比工作图小时直接从工作图缩放，免去再读一遍大图
+    with stage_timer(timings, 'resize'):
+        canvas_scale = min((canvas[0] - padding * 2) / w, (canvas[1] - padding * 2) / h)
+        if canvas_scale <= work_scale:
+            output, ratio, (x_offset, y_offset) = _fit_canvas(work, canvas, padding)
+        else:
+            output, scale, (x_offset, y_offset) = _fit_canvas(img, canvas, padding)
+            ratio = scale / work_scale
+    contour = np.round(main_contour * ratio + (x_offset, y_offset)).astype(np.int32)
+    points = [[x * ratio + x_offset, y * ratio + y_offset] for x, y in filtered_points]
+    with stage_timer(timings, 'fade'):
+        fade_outer_contour(output, cv2.cvtColor(output, cv2.COLOR_BGR2GRAY), contour,
+                           thickness=max(3, round(30 * ratio)))
+    return output, points
+
+
+# 数字颜色：深蓝色 (BGR格式)
+NUMBER_COLOR = (139, 90, 43)  # 深蓝色 #2B5A8B
+
+
+class _BoxGrid:
+    """均匀网格空间哈希：保存已占用的矩形，查询只看矩形覆盖到的格子"""
+    
+    def __init__(self, cell_size: int):
+        self.cell_size = max(1, cell_size)
+        self.cells = {}
     
+    def _cells(self, box):
+        x0, y0, x1, y1 = box
+        size = self.cell_size
+        for gy in range(y0 // size, y1 // size + 1):
+            for gx in range(x0 // size, x1 // size + 1):
+                yield gx, gy
+    
+    def add(self, box):
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(box)
+    
+    def overlaps(self, box) -> int:
+        """与 box 相交的已占用矩形个数（跨多个格子的矩形只计一次）"""
+        x0, y0, x1, y1 = box
+        hits = set()
+        for cell in self._cells(box):
+            for other in self.cells.get(cell, ()):
+                bx0, by0, bx1, by1 = other
+                if x0 < bx1 and bx0 < x1 and y0 < by1 and by0 < y1:
+                    hits.add(other)
+        return len(hits)
+
+
+# 编号框四周额外留出的间距
+LABEL_MARGIN = 2
+# 灰度低于该值的像素（线稿和淡化后的外轮廓）视为编号不能压住的深色像素
+LABEL_DARK_THRESHOLD = 240
+# 编号离圆点的距离：先试 1~3 倍 offset；都会与其他编号或圆点重叠时再试更远的 4~6 倍
+LABEL_NEAR_RINGS = (1, 2, 3)
+LABEL_FAR_RINGS = (4, 5, 6)
+# 仍有重叠时整页字号按该比例缩小后重新布局，直到不再重叠或到达最小字号
+LABEL_SHRINK = 0.85
+LABEL_MIN_FONT_SCALE = 0.3
+
+
+def _label_candidates(x, y, cx, cy, distances, text_w, text_h):
+    """
+    编号左下角的候选位置：先是旧规则（按点相对质心的象限朝外放），
+    再按与该方向的接近程度尝试其余 7 个方向，之后在 distances 中的更远距离上重复
+    """
+    outward = (1 if x > cx else -1, -1 if y < cy else 1)
+    directions = [(sx, sy) for sx in (1, -1, 0) for sy in (-1, 1, 0) if sx or sy]
+    directions.sort(key=lambda d: -(d[0] * outward[0] + d[1] * outward[1]))
+    for distance in distances:
+        for sx, sy in directions:
+            if sx > 0:
+                text_x = x + distance
+            elif sx < 0:
+                text_x = x - distance - text_w
+            else:
+                text_x = x - text_w // 2
+            if sy < 0:
+                text_y = y - distance
+            elif sy > 0:
+                text_y = y + distance + text_h
+            else:
+                text_y = y + text_h // 2
+            yield text_x, text_y
+
+
+def layout_labels(output, points):
+    """
+    按画面尺寸计算圆点半径、字号和每个编号的位置（PNG 和 SVG 输出共用）
+    
+    每个编号依次尝试若干候选位置，选第一个既不压住已放置的编号和圆点、也不压住深色像素的位置；
+    都不满足时取重叠个数最少、其次深色像素最少的。近处（LABEL_NEAR_RINGS）找不到不重叠的位置时
+    再试远处（LABEL_FAR_RINGS）；整页仍有重叠时按 LABEL_SHRINK 缩小字号重新布局。
+    编号框和圆点放进均匀网格，深色像素数用积分图 O(1) 求出，整体接近线性，
+    200 个点的页面也只需几十毫秒。
+    
+    返回 (dot_radius, font_scale, font_thickness, labels)，
+    labels 为 [(文字, 点坐标, 文字左下角坐标, 文字宽高)]
+    """
+    shape = output.shape
     # 绘制参数
-    dot_radius = max(4, int(min(img.shape[:2]) / 150))  # 缩小圆点
+    dot_radius = max(4, int(min(shape[:2]) / 150))  # 缩小圆点
     # 缩小字体
-    base_font_scale = max(0.35, min(img.shape[:2]) / 1200)  # 缩小基础字体
-    if len(filtered_points) > 10:
+    base_font_scale = max(0.35, min(shape[:2]) / 1200)  # 缩小基础字体
+    if len(points) > 10:
         font_scale = base_font_scale * 0.75  # 缩小到75%
     else:
         font_scale = base_font_scale
-    font_thickness = max(1, int(font_scale * 2))  # 减小字体粗细
-    
-    # 数字颜色：深蓝色 (BGR格式)
-    number_color = (139, 90, 43)  # 深蓝色 #2B5A8B
     
     # 计算质心（用于标签位置调整）
-    cx = int(np.mean([p[0] for p in filtered_points]))
-    cy = int(np.mean([p[1] for p in filtered_points]))
+    cx = int(np.mean([p[0] for p in points]))
+    cy = int(np.mean([p[1] for p in points]))
     
-    # 只绘制编号点和数字（不画连接虚线）
-    for i, point in enumerate(filtered_points):
-        x, y = int(point[0]), int(point[1])
+    gray = output if output.ndim == 2 else cv2.cvtColor(output, cv2.COLOR_BGR2GRAY)
+    dark = cv2.integral((gray < LABEL_DARK_THRESHOLD).astype(np.uint8))
+    height, width = shape[:2]
+    
+    def dark_pixels(box):
+        x0, y0 = max(0, box[0]), max(0, box[1])
+        x1, y1 = min(width, box[2]), min(height, box[3])
+        if x0 >= x1 or y0 >= y1:
+            return 0
+        return int(dark[y1, x1] - dark[y0, x1] - dark[y1, x0] + dark[y0, x0])
+    
+    dots = [(int(p[0]), int(p[1])) for p in points]
+    offset = dot_radius + 5
+    
+    def place(font_scale, font_thickness):
+        """按给定字号放置全部编号，返回 (labels, 仍与其他编号或圆点重叠的编号数)"""
+        # 网格格子与最长的编号框同大，每次查询只涉及常数个格子
+        widest = cv2.getTextSize(str(len(points)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
+        grid = _BoxGrid(max(widest) + LABEL_MARGIN * 2)
+        for x, y in dots:
+            grid.add((x - dot_radius, y - dot_radius, x + dot_radius, y + dot_radius))
         
+        labels, overlapping = [], 0
+        for i, (x, y) in enumerate(dots):
+            # 数字标签
+            label = str(i + 1)
+            text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
+            
+            best = None
+            for rings in (LABEL_NEAR_RINGS, LABEL_FAR_RINGS):
+                distances = [offset * ring for ring in rings]
+                for text_x, text_y in _label_candidates(x, y, cx, cy, distances, *text_size):
+                    # 边界检查
+                    text_x = max(5, min(text_x, width - text_size[0] - 5))
+                    text_y = max(text_size[1] + 5, min(text_y, height - 5))
+                    box = (text_x - LABEL_MARGIN, text_y - text_size[1] - LABEL_MARGIN,
+                           text_x + text_size[0] + LABEL_MARGIN, text_y + LABEL_MARGIN)
+                    score = (grid.overlaps(box), dark_pixels(box))
+                    if best is None or score < best[0]:
+                        best = (score, (text_x, text_y), box)
+                        if score == (0, 0):
+                            break
+                if best[0][0] == 0:
+                    break
+            
+            grid.add(best[2])
+            overlapping += best[0][0] > 0
+            labels.append((label, (x, y), best[1], text_size))
+        return labels, overlapping
+    
+    while True:
+        font_thickness = max(1, int(font_scale * 2))  # 减小字体粗细
+        labels, overlapping = place(font_scale, font_thickness)
+        if not overlapping or font_scale <= LABEL_MIN_FONT_SCALE:
+            break
+        font_scale = max(LABEL_MIN_FONT_SCALE, font_scale * LABEL_SHRINK)
+    return dot_radius, font_scale, font_thickness, labels
+
+
+def draw_numbered_dots(output, points):
+    """在 output 上原地画黑色圆点和编号，点大小和字号按 output 尺寸计算"""
+    dot_radius, font_scale, font_thickness, labels = layout_labels(output, points)
+    
+    # 只绘制编号点和数字（不画连接虚线）
+    for label, (x, y), text_origin, _ in labels:
         # 画黑色圆点
         cv2.circle(output, (x, y), dot_radius, (0, 0, 0), -1)
-        
-        # 数字标签
-        label = str(i + 1)
-        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
-        
-        # 标签位置：根据点相对于质心的位置调整
-        offset = dot_radius + 5
-        if x > cx:
-            text_x = x + offset
-        else:
-            text_x = x - offset - text_size[0]
-        
-        if y < cy:
-            text_y = y - offset
-        else:
-            text_y = y + offset + text_size[1]
-        
-        # 边界检查
-        text_x = max(5, min(text_x, img.shape[1] - text_size[0] - 5))
-        text_y = max(text_size[1] + 5, min(text_y, img.shape[0] - 5))
-        
-        cv2.putText(output, label, (text_x, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, number_color, font_thickness)
+        cv2.putText(output, label, text_origin,
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, NUMBER_COLOR, font_thickness)
+    return output
+
+
+def render_dot_to_dot(img, log=None, **options):
+    """
+    点对点图主流程：找最大外轮廓 -> 选点 -> 淡化外轮廓 -> 画编号点，返回 BGR 图像数组
+    
+    所有输出方式（文件 / PNG 字节 / 二进制 stdout / base64）共用这一流程，参数见 prepare_dot_to_dot；
+    找不到轮廓时返回 None。日志写到 log（默认 stderr）。
+    inplace=True 时直接在 img 上绘制（调用方不再需要原图时省去一次整图复制）。
+    修改流程或绘制参数导致输出变化时需递增 PIPELINE_VERSION，使旧缓存失效。
+    """
+    prepared = prepare_dot_to_dot(img, log=log, **options)
+    if prepared is None:
+        return None
+    output, points = prepared
+    return draw_numbered_dots(output, points)
+
+
+# ---------- 输出方式 ----------
+
+def encode_png(output, compression: int = None) -> bytes:
+    """编码为 PNG 字节（compression 为 zlib 压缩级别 0-9，缺省用 OpenCV 默认值）"""
+    params = [] if compression is None else [cv2.IMWRITE_PNG_COMPRESSION, compression]
+    ok, buffer = cv2.imencode('.png', output, params)
+    if not ok:
+        raise ValueError('PNG encoding failed')
+    return buffer.tobytes()
+
+
+# 输出编码：png 为 3 通道 PNG；gray 为 192 级灰度 + 64 级编号颜色的 8 位索引 PNG（视觉无损）；
+# palette 为 12 级灰度 + 4 级编号颜色的 4 位索引 PNG；webp 为无损 WebP
+ENCODINGS = ['png', 'gray', 'palette', 'webp']
+ENCODING_MIME = {'png': 'image/png', 'gray': 'image/png', 'palette': 'image/png', 'webp': 'image/webp'}
+# 通道最大差超过该值的像素视为编号颜色（抗锯齿边缘是编号颜色与白底的混合）
+INK_CHROMA = 8
+# 彩色像素偏离「编号颜色 -> 白色」色阶超过该距离时，说明线稿本身是彩色的，改用 3 通道 PNG
+INK_TOLERANCE = 16
+# SVG 内嵌灰度线稿的灰度级数（与原图最大相差 2 级）
+SVG_GRAY_LEVELS = 64
+
+
+def _chroma(output):
+    """逐像素的通道最大值 - 最小值（按通道用 cv2 计算，numpy 沿 axis=2 归约慢一个数量级）"""
+    b, g, r = cv2.split(output)
+    return cv2.subtract(cv2.max(cv2.max(b, g), r), cv2.min(cv2.min(b, g), r))
+
+
+def encode_indexed_png(output, gray_levels: int, ink_levels: int, compression: int = None) -> bytes:
+    """
+    编码为索引 PNG：前 gray_levels 个索引为均匀分布的灰度，
+    其后 ink_levels 个为编号颜色（NUMBER_COLOR）与白色按比例混合的色阶，最后一个即编号颜色本身
+    
+    页面只有灰度线稿、黑色圆点和一种编号颜色；编号的抗锯齿像素按与白色的混合比例归入色阶。
+    总色数不超过 16 时 Pillow 自动写成 4 位 PNG。输入线稿带有其他颜色时退回 encode_png。
+    """
+    from PIL import Image
     
+    gray = cv2.cvtColor(output, cv2.COLOR_BGR2GRAY)
+    indices = cv2.LUT(gray, np.rint(np.arange(256) * ((gray_levels - 1) / 255)).astype(np.uint8))
+    
+    tinted = _chroma(output) > INK_CHROMA
+    if tinted.any():
+        # 混合比例 t：像素到白色的距离在「编号颜色 -> 白色」方向上的投影
+        direction = 255 - np.array(NUMBER_COLOR, dtype=np.float32)
+        distance = 255 - output[tinted].astype(np.float32)
+        t = (distance @ direction) / (direction @ direction)
+        if np.abs(distance - t[:, None] * direction).max() > INK_TOLERANCE:
+            return encode_png(output, compression)
+        indices[tinted] = gray_levels + np.clip(np.rint(t * ink_levels) - 1, 0, ink_levels - 1).astype(np.uint8)
+    
+    palette = []
+    for i in range(gray_levels):
+        palette += [round(i * 255 / (gray_levels - 1))] * 3
+    for k in range(1, ink_levels + 1):
+        palette += [round(255 - (255 - c) * k / ink_levels) for c in NUMBER_COLOR[::-1]]
+    image = Image.frombytes('P', (output.shape[1], output.shape[0]), indices.tobytes())
+    image.putpalette(palette)
+    
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', **({} if compression is None else {'compress_level': compression}))
+    return buffer.getvalue()
+
+
+def encode_image(output, encoding: str = 'png', compression: int = None) -> bytes:
+    """按 ENCODINGS 中的一种编码输出图像；compression 只对 PNG 类编码生效"""
+    if encoding == 'png':
+        return encode_png(output, compression)
+    if encoding == 'gray':
+        return encode_indexed_png(output, 192, 64, compression)
+    if encoding == 'palette':
+        return encode_indexed_png(output, 12, 4, compression)
+    if encoding == 'webp':
+        # 质量参数大于 100 时 OpenCV 使用无损模式
+        ok, buffer = cv2.imencode('.webp', output, [cv2.IMWRITE_WEBP_QUALITY, 101])
+        if not ok:
+            raise ValueError('WebP encoding failed')
+        return buffer.tobytes()
+    raise ValueError(f'unknown encoding: {encoding}')
+
+
+def encode_svg(output, points) -> bytes:
+    """
+    编码为 SVG：淡化外轮廓后的线稿作为一张 PNG 嵌入，圆点和编号为 <circle>/<text> 元素，
+    位置与 PNG 输出相同，打印时任意 DPI 都清晰
+    
+    线稿（此时还没有编号颜色）各通道差不超过 INK_CHROMA 时按 SVG_GRAY_LEVELS 级灰度存成索引 PNG
+    （扫描件、导出的素材常带几级色偏，逐字节判断灰度会退回 3 通道）；彩色线稿仍存 3 通道 PNG。
+    """
+    height, width = output.shape[:2]
+    dot_radius, font_scale, font_thickness, labels = layout_labels(output, points)
+    
+    if _chroma(output).max() <= INK_CHROMA:
+        buffer = encode_indexed_png(output, SVG_GRAY_LEVELS, 1)
+    else:
+        # 线稿大片留白，RLE 策略体积接近最高压缩级别，耗时只有后者的几分之一
+        ok, buffer = cv2.imencode('.png', output, [cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_RLE])
+        if not ok:
+            raise ValueError('PNG encoding failed')
+    
+    # 字号按 Hershey 字体的数字高度换算（无衬线字体数字高度约为字号的 0.72）
+    digit_height = cv2.getTextSize('0', cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0][1]
+    font_weight = 'bold' if font_thickness > 1 else 'normal'
+    number_color = '#{:02X}{:02X}{:02X}'.format(*NUMBER_COLOR[::-1])
+    
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<image width="{width}" height="{height}" '
+        f'xlink:href="data:image/png;base64,{base64.b64encode(buffer).decode("ascii")}"/>',
+        '<g fill="#000">',
+    ]
+    lines += [f'<circle cx="{x}" cy="{y}" r="{dot_radius}"/>' for _, (x, y), _, _ in labels]
+    lines += ['</g>', f'<g fill="{number_color}" font-family="Arial, Helvetica, sans-serif" '
+                      f'font-size="{digit_height / 0.72:.1f}" font-weight="{font_weight}">']
+    lines += [f'<text x="{tx}" y="{ty}">{label}</text>' for label, _, (tx, ty), _ in labels]
+    lines += ['</g>', '</svg>']
+    return '\n'.join(lines).encode('utf-8')
+
+
+def output_size(data: bytes):
+    """返回 PNG、无损 WebP 或 encode_svg 输出的 (宽, 高)"""
+    if data.startswith(b'\x89PNG'):
+        # PNG 的 IHDR 块紧跟在 8 字节签名后：宽、高各 4 字节大端
+        return struct.unpack('>II', data[16:24])
+    if data[:4] == b'RIFF' and data[8:16] == b'WEBPVP8L':
+        # VP8L 头：签名字节 0x2f 之后是 14 位宽 - 1、14 位高 - 1（小端）
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    match = re.match(rb'<svg [^>]*width="(\d+)" height="(\d+)"', data)
+    if match is None:
+        raise ValueError('unknown output format')
+    return int(match.group(1)), int(match.group(2))
+
+
+def write_framed(data: bytes, stream=None):
+    """写入 4 字节大端长度前缀 + 数据（默认写到二进制 stdout）"""
+    stream = stream or sys.stdout.buffer
+    stream.write(struct.pack('>I', len(data)))
+    stream.write(data)
+    stream.flush()
+
+
+def read_input(input_path: str) -> bytes:
+    """读取编码后的图片字节；路径为 - 时从 stdin 读取，读取失败返回 b''"""
+    if input_path == '-':
+        return sys.stdin.buffer.read()
+    try:
+        with open(input_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return b''
+
+
+def decode_image(data: bytes):
+    """在内存中解码图片字节（PNG/JPEG 等），无法解码时返回 None"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def open_cache(directory: Optional[str], max_mb: float) -> Optional[ResultCache]:
+    """按配置打开结果缓存（最终 PNG/SVG），未配置目录时不启用"""
+    if not directory:
+        return None
+    return ResultCache(directory, int(max_mb * 1024 * 1024))
+
+
+# 渲染参数及其缺省值（同时决定缓存键，新增参数必须加在这里）
+RENDER_DEFAULTS = {
+    'num_points': 50,
+    'angle_threshold': 20,
+    'target_count': None,
+    'interpolate': False,
+    'canvas': None,
+    'padding': 40,
+    'work_size': 800,
+    'encoding': 'png',
+    'compression': None,
+}
+
+
+def _render(data: bytes, cache: Optional[ResultCache], log, svg: bool, options: dict,
+            timings: Optional[dict] = None):
+    """render_png / render_svg 的共同实现"""
+    unknown = set(options) - set(RENDER_DEFAULTS)
+    if unknown:
+        raise TypeError(f"unknown render options: {', '.join(sorted(unknown))}")
+    options = {**RENDER_DEFAULTS, **options}
+    if options['canvas'] is not None:
+        options['canvas'] = [int(v) for v in options['canvas']]
+    if options['encoding'] not in ENCODINGS:
+        raise ValueError(f"unknown encoding: {options['encoding']}")
+    if options['compression'] is not None and not 0 <= options['compression'] <= 9:
+        raise ValueError('compression must be between 0 and 9')
+    key = None
+    if cache is not None:
+        with stage_timer(timings, 'cache'):
+            key = ResultCache.make_key('dot_to_dot_svg' if svg else 'dot_to_dot', PIPELINE_VERSION,
+                                       hashlib.sha256(data).hexdigest(), options)
+            result = cache.get(key)
+        if result is not None:
+            note_metrics(timings, bytes=len(result), cached=True)
+            return result, True
+    
+    with stage_timer(timings, 'decode'):
+        img = decode_image(data)
+    if img is None:
+        raise ValueError('cannot decode image')
+    encoding, compression = options.pop('encoding'), options.pop('compression')
+    prepared = prepare_dot_to_dot(img, log=log, inplace=True, timings=timings, **options)
+    if prepared is None:
+        raise ValueError('no contours found')
+    output, points = prepared
+    if svg:
+        with stage_timer(timings, 'encode'):
+            result = encode_svg(output, points)
+    else:
+        with stage_timer(timings, 'draw'):
+            draw_numbered_dots(output, points)
+        with stage_timer(timings, 'encode'):
+            result = encode_image(output, encoding, compression)
+    
+    note_metrics(timings, output={'width': output.shape[1], 'height': output.shape[0]}, bytes=len(result),
+                 cached=False)
+    if cache is not None:
+        with stage_timer(timings, 'cache'):
+            cache.put(key, result)
+    return result, False
+
+
+def render_png(data: bytes, cache: Optional[ResultCache] = None, log=None,
+               timings: Optional[dict] = None, **options):
+    """
+    由编码后的图片字节生成点对点图 PNG，返回 (PNG 字节, 是否命中缓存)
+    
+    options 见 RENDER_DEFAULTS（encoding 见 ENCODINGS，为 webp 时返回 WebP 字节；SVG 输出忽略 encoding）；
+    缓存键为输入字节的 SHA-256 + 全部渲染参数 + PIPELINE_VERSION；
+    图片无法解码或找不到轮廓时抛出 ValueError。
+    timings 不为空时按阶段累加耗时（秒），阶段名见 prepare_dot_to_dot，另有 cache / decode / draw / encode。
+    """
+    return _render(data, cache, log, False, options, timings)
+
+
+def render_svg(data: bytes, cache: Optional[ResultCache] = None, log=None,
+               timings: Optional[dict] = None, **options):
+    """与 render_png 相同，但输出 SVG（见 encode_svg），返回 (SVG 字节, 是否命中缓存)"""
+    return _render(data, cache, log, True, options, timings)
+
+
+def _render_input(input_path: str, log, cache: Optional[ResultCache], options: dict,
+                  svg: bool = False, timings: Optional[dict] = None) -> bytes:
+    """读取输入并渲染为 PNG（svg=True 时为 SVG）字节，失败时打印错误并返回 b''"""
+    with stage_timer(timings, 'read'):
+        data = read_input(input_path)
+    if not data:
+        print(f"[ERROR] Cannot read image: {'<stdin>' if input_path == '-' else input_path}", file=log)
+        return b''
+    try:
+        result, cached = (render_svg if svg else render_png)(data, cache, log=log, timings=timings, **options)
+    except ValueError as e:
+        print(f"[ERROR] {e}: {'<stdin>' if input_path == '-' else input_path}", file=log)
+        return b''
+    if cached:
+        print("   - 命中缓存", file=log)
+    return result
+
+
+def generate_dot_to_dot(input_path: str, output_path: str = None, 
+                        num_points: int = 50, angle_threshold: int = 20,
+                        target_count: int = None, interpolate: bool = False,
+                        cache: Optional[ResultCache] = None,
+                        canvas: tuple = None, padding: int = 40, work_size: int = 800,
+                        encoding: str = 'png', compression: int = None,
+                        timings: Optional[dict] = None):
+    """
+    将黑白线稿转换为点对点连线图
+    
+    Args:
+        input_path: 输入图片路径（- 表示从 stdin 读取图片字节）
+        output_path: 输出图片路径（从 stdin 读取时必须指定；.svg 结尾时输出 SVG，.webp 结尾时输出无损 WebP）
+        num_points: 初始采样点数量
+        angle_threshold: 角度过滤阈值（越小保留的点越少）
+        target_count: 指定时输出恰好这么多个点（忽略角度阈值）
+        interpolate: 采样点在轮廓线段上插值，而不是取最近的轮廓顶点
+        cache: 结果缓存（见 open_cache）
+        canvas: (宽, 高)，指定时在低分辨率（work_size）上检测轮廓，直接按画布分辨率居中绘制
+        padding: 画布四周留白
+        work_size: 指定画布时轮廓检测使用的分辨率（长边）
+        encoding: 输出编码（见 ENCODINGS）
+        compression: PNG 压缩级别 0-9
+        timings: 按阶段累加耗时的 dict（或 RunMetrics），见 render_png
+    """
     # 生成输出路径
     if output_path is None:
+        if input_path == '-':
+            raise ValueError('output_path is required when reading from stdin')
         base, ext = os.path.splitext(input_path)
         output_path = f"{base}_dots{ext}"
     
-    cv2.imwrite(output_path, output)
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext == '.webp':
+        encoding = 'webp'
+    elif ext == '.png' and encoding == 'webp':
+        raise ValueError('webp encoding needs an output path ending in .webp')
+    result = _render_input(input_path, sys.stdout, cache, {
+        'num_points': num_points, 'angle_threshold': angle_threshold,
+        'target_count': target_count, 'interpolate': interpolate,
+        'canvas': canvas, 'padding': padding, 'work_size': work_size,
+        'encoding': encoding, 'compression': compression}, svg=ext == '.svg', timings=timings)
+    if not result:
+        return None
+    
+    with stage_timer(timings, 'write'):
+        if ext in ('.png', '.svg', '.webp'):
+            with open(output_path, 'wb') as f:
+                f.write(result)
+        else:
+            cv2.imwrite(output_path, decode_image(result))
     print(f"[OK] Dot-to-dot image generated: {output_path}")
     
     return output_path
 
 
-def generate_dot_to_dot_base64(input_path: str, num_points: int = 50, angle_threshold: int = 20) -> str:
+def generate_dot_to_dot_png(input_path: str, num_points: int = 50, angle_threshold: int = 20,
+                            target_count: int = None, interpolate: bool = False,
+                            cache: Optional[ResultCache] = None,
+                            canvas: tuple = None, padding: int = 40, work_size: int = 800,
+                            encoding: str = 'png', compression: int = None,
+                            timings: Optional[dict] = None) -> bytes:
+    """
+    生成点对点图并返回 PNG 字节（encoding 为 webp 时为 WebP，不保存文件），失败时返回 b''
+    """
+    return _render_input(input_path, sys.stderr, cache, {
+        'num_points': num_points, 'angle_threshold': angle_threshold,
+        'target_count': target_count, 'interpolate': interpolate,
+        'canvas': canvas, 'padding': padding, 'work_size': work_size,
+        'encoding': encoding, 'compression': compression}, timings=timings)
+
+
+def generate_dot_to_dot_svg(input_path: str, num_points: int = 50, angle_threshold: int = 20,
+                            target_count: int = None, interpolate: bool = False,
+                            cache: Optional[ResultCache] = None,
+                            canvas: tuple = None, padding: int = 40, work_size: int = 800,
+                            encoding: str = 'png', compression: int = None,
+                            timings: Optional[dict] = None) -> bytes:
+    """
+    生成点对点图并返回 SVG 字节（不保存文件），失败时返回 b''
+    """
+    return _render_input(input_path, sys.stderr, cache, {
+        'num_points': num_points, 'angle_threshold': angle_threshold,
+        'target_count': target_count, 'interpolate': interpolate,
+        'canvas': canvas, 'padding': padding, 'work_size': work_size,
+        'encoding': encoding, 'compression': compression}, svg=True, timings=timings)
+
+
+def generate_dot_to_dot_base64(input_path: str, num_points: int = 50, angle_threshold: int = 20,
+                               target_count: int = None, interpolate: bool = False,
+                               cache: Optional[ResultCache] = None,
+                               canvas: tuple = None, padding: int = 40, work_size: int = 800,
+                               encoding: str = 'png', compression: int = None,
+                               timings: Optional[dict] = None) -> str:
     """
     生成点对点图并返回 base64 编码（不保存文件）
     """
-    import base64
-    
-    # 读取图片
-    img = cv2.imread(input_path)
-    if img is None:
-        print(f"[ERROR] Cannot read image: {input_path}", file=sys.stderr)
+    png = generate_dot_to_dot_png(input_path, num_points, angle_threshold, target_count, interpolate,
+                                  cache, canvas, padding, work_size, encoding, compression, timings)
+    if not png:
         return ""
     
-    # 放大图片到目标尺寸
-    target_size = 800
-    h, w = img.shape[:2]
-    if max(h, w) < target_size:
-        scale = target_size / max(h, w)
-        new_w = int(w * scale)
-        new_h = int(h * scale)
-        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-        print(f"   - 图片放大: {w}x{h} -> {new_w}x{new_h}", file=sys.stderr)
-    
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-    
-    if not contours:
-        print("[ERROR] No contours found", file=sys.stderr)
-        return ""
+    base64_str = base64.b64encode(png).decode('utf-8')
+    print(f"[OK] Generated base64 ({len(base64_str)} chars)", file=sys.stderr)
+    return base64_str
+
+
+# ---------- 批量模式 ----------
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+# 批量汇总中各阶段的显示顺序（read / write 为读写文件，其余见 render_png）
+STAGES = ('read', 'cache', 'decode', 'resize', 'threshold', 'contours', 'resample', 'filter',
+          'fade', 'draw', 'encode', 'write')
+
+
+def expand_inputs(pattern: str) -> list:
+    """目录（不递归）或 glob 模式 -> 排序后的图片路径列表，跳过已生成的 *_dots 文件"""
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(path for path in paths
+                  if os.path.isfile(path)
+                  and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+                  and not os.path.splitext(os.path.basename(path))[0].endswith('_dots'))
+
+
+def write_atomic(path: str, data: bytes):
+    """先写同目录下的临时文件再 os.replace，中途失败不会留下半个输出文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _batch_job(input_path: str, output_path: str, cache: Optional[ResultCache], svg: bool,
+               options: dict, log) -> dict:
+    """批量模式中的单张图片（在线程池中执行）"""
+    timings = {}
+    start = time.perf_counter()
+    try:
+        with stage_timer(timings, 'read'):
+            with open(input_path, 'rb') as f:
+                data = f.read()
+        result, cached = (render_svg if svg else render_png)(data, cache, log=log, timings=timings, **options)
+        with stage_timer(timings, 'write'):
+            write_atomic(output_path, result)
+    except (OSError, ValueError) as e:
+        return {'input': input_path, 'ok': False, 'error': str(e), 'timings': timings}
+    return {'input': input_path, 'output': output_path, 'ok': True, 'cached': cached,
+            'seconds': time.perf_counter() - start, 'timings': timings}
+
+
+def run_batch(inputs: list, output_dir: str, workers: Optional[int] = None, svg: bool = False,
+              force: bool = False, cache: Optional[ResultCache] = None, log=None, **options) -> dict:
+    """
+    用线程池批量生成点对点图，输出到 output_dir/<文件名>_dots.png（svg=True 时为 .svg，webp 编码时为 .webp）
     
-    main_contour = max(contours, key=cv2.contourArea)
-    contour_points = main_contour.reshape(-1, 2)
-    total_length = cv2.arcLength(main_contour, closed=True)
-    
-    cumulative_length = [0]
-    for i in range(1, len(contour_points)):
-        dist = np.linalg.norm(contour_points[i] - contour_points[i-1])
-        cumulative_length.append(cumulative_length[-1] + dist)
-    cumulative_length = np.array(cumulative_length)
-    
-    step = total_length / num_points
-    sampled_points = []
-    for i in range(num_points):
-        target_length = i * step
-        idx = np.searchsorted(cumulative_length, target_length)
-        idx = min(idx, len(contour_points) - 1)
-        sampled_points.append(contour_points[idx].tolist())
-    
-    filtered_points = sampled_points
-    for _ in range(2):
-        filtered_points = filter_points_on_angle(filtered_points, angle_threshold)
-    
-    min_points = max(10, num_points // 5)
-    if len(filtered_points) < min_points:
-        step = len(sampled_points) // min_points
-        filtered_points = sampled_points[::step][:min_points]
-    
-    print(f"   - 初始采样: {num_points} 点", file=sys.stderr)
-    print(f"   - 角度过滤后: {len(filtered_points)} 点", file=sys.stderr)
-    
-    output = img.copy()
-    outer_mask = np.zeros(gray.shape, dtype=np.uint8)
-    cv2.drawContours(outer_mask, [main_contour], -1, 255, thickness=30)
-    outer_faint_color = 230
-    
-    for y in range(output.shape[0]):
-        for x in range(output.shape[1]):
-            if outer_mask[y, x] == 255 and gray[y, x] < 200:
-                output[y, x] = [outer_faint_color, outer_faint_color, outer_faint_color]
-    
-    dot_radius = max(4, int(min(img.shape[:2]) / 150))
-    base_font_scale = max(0.35, min(img.shape[:2]) / 1200)
-    font_scale = base_font_scale * 0.75 if len(filtered_points) > 10 else base_font_scale
-    font_thickness = max(1, int(font_scale * 2))
-    number_color = (139, 90, 43)
-    
-    cx = int(np.mean([p[0] for p in filtered_points]))
-    cy = int(np.mean([p[1] for p in filtered_points]))
-    
-    for i, point in enumerate(filtered_points):
-        x, y = int(point[0]), int(point[1])
-        cv2.circle(output, (x, y), dot_radius, (0, 0, 0), -1)
-        
-        label = str(i + 1)
-        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
-        
-        offset = dot_radius + 5
-        text_x = x + offset if x > cx else x - offset - text_size[0]
-        text_y = y - offset if y < cy else y + offset + text_size[1]
+    cv2 的缩放、二值化、找轮廓、编码都会释放 GIL，选点和淡化已经向量化，
+    所以同一进程内多线程就能并行，不必为每张图启动进程。
+    输出比输入新时跳过（force=True 时全部重新生成）。每张图完成后打印一行，
+    最后打印吞吐量和各阶段耗时汇总，并返回汇总 dict。
+    各阶段耗时是各线程内墙钟时间之和，线程数多于 CPU 核数时合计会超过总用时。
+    """
+    log = log or sys.stderr
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = '_dots.svg' if svg else ('_dots.webp' if options.get('encoding') == 'webp' else '_dots.png')
+    
+    jobs, skipped, targets = [], 0, {}
+    for input_path in inputs:
+        output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0] + suffix)
+        if output_path in targets:
+            raise ValueError(f'{input_path} and {targets[output_path]} map to the same output {output_path}')
+        targets[output_path] = input_path
+        if (not force and os.path.exists(output_path)
+                and os.path.getmtime(output_path) >= os.path.getmtime(input_path)):
+            skipped += 1
+            continue
+        jobs.append((input_path, output_path))
+    
+    if workers is None:
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    workers = max(1, min(workers or 1, len(jobs) or 1))
+    
+    stages, done, failed, cached = {}, 0, 0, 0
+    start = time.perf_counter()
+    # 各线程的流程日志会交错在一起，只保留每张图一行结果
+    with open(os.devnull, 'w') as quiet, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_batch_job, input_path, output_path, cache, svg, options, quiet)
+                   for input_path, output_path in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            for name, seconds in record['timings'].items():
+                stages[name] = stages.get(name, 0.0) + seconds
+            if record['ok']:
+                done += 1
+                cached += record['cached']
+                print(f"[OK] {record['input']} -> {record['output']} ({record['seconds'] * 1000:.0f} ms"
+                      f"{', 缓存' if record['cached'] else ''})", file=log)
+            else:
+                failed += 1
+                print(f"[ERROR] {record['error']}: {record['input']}", file=log)
+    elapsed = time.perf_counter() - start
+    
+    summary = {'images': done, 'failed': failed, 'skipped': skipped, 'cached': cached,
+               'workers': workers, 'seconds': elapsed,
+               'images_per_sec': done / elapsed if elapsed > 0 else 0.0,
+               'stages': {name: stages[name] for name in STAGES if name in stages}}
+    print(f"\n批量完成: {done} 张（跳过 {skipped}，失败 {failed}，命中缓存 {cached}），"
+          f"{workers} 线程，用时 {elapsed:.2f} s，{summary['images_per_sec']:.1f} 张/秒", file=log)
+    if stages:
+        total = sum(stages.values())
+        print(f"   {'阶段':<10} {'合计 ms':>10} {'每张 ms':>10} {'占比':>7}", file=log)
+        for name, seconds in summary['stages'].items():
+            print(f"   {name:<10} {seconds * 1000:>10.1f} {seconds * 1000 / max(1, done + failed):>10.2f} "
+                  f"{seconds / total:>7.1%}", file=log)
+    return summary
+
+
+# ---------- 常驻模式 ----------
+
+OUTPUT_FORMATS = ['png', 'base64', 'svg']
+
+
+def _read_exact(stream, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+
+def read_framed(stream):
+    """读取一帧（4 字节大端长度 + 数据）；在帧边界遇到 EOF 时返回 None"""
+    prefix = _read_exact(stream, 4)
+    if not prefix:
+        return None
+    if len(prefix) < 4:
+        raise EOFError('truncated frame')
+    size = struct.unpack('>I', prefix)[0]
+    data = _read_exact(stream, size)
+    if len(data) < size:
+        raise EOFError('truncated frame')
+    return data
+
+
+def _parse_canvas(value):
+    """画布尺寸：None、[宽, 高] 或 "宽x高"，不合法时抛出 ValueError"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.lower().split('x')
+    if len(value) != 2:
+        raise ValueError(f'invalid canvas size: {value}')
+    width, height = int(value[0]), int(value[1])
+    if width <= 0 or height <= 0:
+        raise ValueError(f'invalid canvas size: {value}')
+    return (width, height)
+
+
+def _render_options(header: dict) -> dict:
+    """从请求头取出渲染参数（缺省值与命令行一致）"""
+    target_count = header.get('target_count')
+    if target_count is not None:
+        target_count = int(target_count)
+        if target_count < 3:
+            raise ValueError('target_count must be at least 3')
+    return {
+        'num_points': int(header.get('num_points', 50)),
+        'angle_threshold': int(header.get('angle_threshold', 20)),
+        'target_count': target_count,
+        'interpolate': bool(header.get('interpolate', False)),
+        'canvas': _parse_canvas(header.get('canvas')),
+        'padding': int(header.get('padding', 40)),
+        'work_size': int(header.get('work_size', 800)),
+        'encoding': header.get('encoding', 'png'),
+        'compression': None if header.get('compression') is None else int(header['compression']),
+    }
+
+
+def handle_request(header: dict, payload: bytes, cache: Optional[ResultCache] = None,
+                   metrics: bool = False):
+    """
+    处理一条常驻模式请求，返回 (响应头, 响应数据)
+    
+    图片放在请求数据里（编码后的字节），或者请求头给出 "path"；
+    "format" 为 png（图片字节）、base64（图片的 base64 文本）或 svg（SVG 文本）；
+    "encoding" / "compression" 选择图片编码（见 ENCODINGS），响应头的 "mime" 为实际类型；
+    请求头 "metrics": true（或 metrics=True）时响应头附带 "metrics"（见 RunMetrics，
+    各阶段的 peak_rss_kb 为该阶段内的 RSS 峰值）；
+    请求头 {"stats": true} 返回缓存命中/未命中计数。
+    """
+    if header.get('stats'):
+        return {'ok': True, 'cache': cache.stats() if cache is not None else None}, b''
+    
+    fmt = header.get('format', 'png')
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f'unknown format: {fmt}')
+    options = _render_options(header)
+    timings = RunMetrics() if metrics or header.get('metrics') else None
+    
+    if payload:
+        data = payload
+    elif header.get('path'):
+        with stage_timer(timings, 'read'):
+            data = read_input(header['path'])
+        if not data:
+            raise ValueError(f"cannot read image: {header['path']}")
+    else:
+        raise ValueError('request has no image')
+    
+    result, cached = (render_svg if fmt == 'svg' else render_png)(data, cache, timings=timings, **options)
+    width, height = output_size(result)
+    if fmt == 'base64':
+        result = base64.b64encode(result)
+    mime = 'image/svg+xml' if fmt == 'svg' else ENCODING_MIME[options['encoding']]
+    response = {'ok': True, 'format': fmt, 'mime': mime, 'width': width, 'height': height, 'cached': cached}
+    if timings is not None:
+        response['metrics'] = timings.record(format=fmt)
+    return response, result
+
+
+def serve(stdin=None, stdout=None, cache: Optional[ResultCache] = None, metrics: bool = False):
+    """
+    常驻模式：请求和响应都是「头帧 + 数据帧」，每帧为 4 字节大端长度 + 内容，头帧为 JSON
+    
+    单个请求出错（图片损坏、参数错误）只返回 ok=false，进程继续服务；输入在帧中间截断时退出。
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    while True:
+        raw_header = read_framed(stdin)
+        if raw_header is None:
+            return
+        payload = read_framed(stdin)
+        if payload is None:
+            raise EOFError('missing payload frame')
         
-        text_x = max(5, min(text_x, img.shape[1] - text_size[0] - 5))
-        text_y = max(text_size[1] + 5, min(text_y, img.shape[0] - 5))
+        request_id = None
+        try:
+            header = json.loads(raw_header)
+            if not isinstance(header, dict):
+                raise ValueError('request header must be a JSON object')
+            request_id = header.get('id')
+            response, data = handle_request(header, payload, cache, metrics)
+        except Exception as e:
+            response, data = {'ok': False, 'error': str(e)}, b''
         
-        cv2.putText(output, label, (text_x, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, number_color, font_thickness)
+        raw_response = json.dumps({'id': request_id, **response}).encode('utf-8')
+        stdout.write(struct.pack('>I', len(raw_response)) + raw_response)
+        stdout.write(struct.pack('>I', len(data)))
+        stdout.write(data)
+        stdout.flush()
+
+
+def serve_socket(path: str, cache: Optional[ResultCache] = None, metrics: bool = False):
+    """在 Unix socket 上提供与 stdin 相同的帧协议，每个连接一个线程"""
+    import socketserver
     
-    # 编码为 PNG 并转 base64
-    _, buffer = cv2.imencode('.png', output)
-    base64_str = base64.b64encode(buffer).decode('utf-8')
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                serve(self.rfile, self.wfile, cache, metrics)
+            except (EOFError, ConnectionError):
+                pass
     
-    print(f"[OK] Generated base64 ({len(base64_str)} chars)", file=sys.stderr)
-    return base64_str
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        print(f"[OK] Serving on {path}", file=sys.stderr)
+        server.serve_forever()
 
 
 def main():
@@ -326,18 +1296,136 @@ def main():
         print("\n示例: python scripts/dot_to_dot.py docs/ki.png")
         return
     
-    input_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
-    num_points = int(sys.argv[3]) if len(sys.argv) > 3 else 50
-    angle_threshold = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    # 兼容旧调用方式：第二个位置参数为 "--stdout" 时输出 base64 到 stdout
+    argv = sys.argv[1:]
+    if len(argv) > 1 and argv[1] == '--stdout':
+        argv[1] = '-'
+    
+    parser = argparse.ArgumentParser(description='点对点连线图生成器')
+    parser.add_argument('input', nargs='?', default=None, help='输入图片路径（- 表示从 stdin 读取图片字节）')
+    parser.add_argument('output', nargs='?', default=None,
+                       help='输出图片路径（- 表示 base64 输出到 stdout）')
+    parser.add_argument('num_points', nargs='?', type=int, default=50, help='初始采样点数量')
+    parser.add_argument('angle_threshold', nargs='?', type=int, default=20, help='角度过滤阈值')
+    parser.add_argument('-t', '--target-count', type=int, default=None,
+                       help='输出恰好 N 个点（如 10/20/50/100），忽略角度阈值')
+    parser.add_argument('--interpolate', action='store_true',
+                       help='采样点在轮廓线段上插值，而不是取最近的轮廓顶点')
+    parser.add_argument('--canvas', default=None, metavar='WxH',
+                       help='直接在 宽x高 的画布上居中绘制（低分辨率检测轮廓，按画布分辨率绘制点和编号）')
+    parser.add_argument('--padding', type=int, default=40, help='画布四周留白（配合 --canvas）')
+    parser.add_argument('--work-size', type=int, default=800,
+                       help='配合 --canvas 时轮廓检测使用的分辨率（长边像素）')
+    parser.add_argument('--svg', action='store_true',
+                       help='输出 SVG（线稿内嵌为灰度 PNG，圆点和编号为矢量元素）；输出路径以 .svg 结尾时自动启用')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='png',
+                       help='输出编码：png（3 通道）、gray（灰度 + 编号色阶的 8 位索引 PNG）、'
+                            'palette（16 色索引 PNG）、webp（无损）；输出路径以 .webp 结尾时自动为 webp')
+    parser.add_argument('--compression', type=int, choices=range(10), default=None, metavar='0-9',
+                       help='PNG 压缩级别（png/gray/palette 编码）')
+    parser.add_argument('--binary', action='store_true',
+                       help='输出到 stdout 时写 4 字节大端长度 + PNG 字节，而不是 base64 文本')
+    parser.add_argument('--cache-dir', default=os.environ.get('DOTS_CACHE_DIR'),
+                       help='结果缓存目录（按输入内容 + 参数缓存最终 PNG，默认读取 DOTS_CACHE_DIR）')
+    parser.add_argument('--cache-max-mb', type=float,
+                       default=float(os.environ.get('DOTS_CACHE_MAX_MB') or 64),
+                       help='缓存容量上限（MB），超出后淘汰最久未使用的条目')
+    parser.add_argument('--batch', action='store_true',
+                       help='批量模式：input 为目录或 glob（如 "assets/*.png"），output 为输出目录')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='批量模式线程数（默认可用 CPU 核数）')
+    parser.add_argument('--force', action='store_true', help='批量模式下即使输出比输入新也重新生成')
+    parser.add_argument('--metrics', choices=['json'], default=None,
+                       help='运行结束后向 stderr 输出一行 JSON 指标（各阶段耗时和 RSS 峰值、尺寸、轮廓长度、点数）；'
+                            '常驻模式下附在每个响应头的 "metrics" 中')
+    parser.add_argument('--serve', action='store_true',
+                       help='常驻模式：从 stdin 读取帧请求，向 stdout 写帧响应')
+    parser.add_argument('--socket', default=None, metavar='PATH',
+                       help='常驻模式改为监听 Unix socket')
+    args = parser.parse_args(argv)
+    
+    cache = open_cache(args.cache_dir, args.cache_max_mb)
+    if args.serve or args.socket:
+        # 预先完成导入和首次调用的初始化，第一条请求不再承担这部分开销
+        # （首次 getTextSize 要加载 Hershey 字体，约 30 ms）
+        encode_png(np.zeros((1, 1, 3), dtype=np.uint8))
+        cv2.getTextSize('0', cv2.FONT_HERSHEY_SIMPLEX, 1, 1)
+        if args.socket:
+            serve_socket(args.socket, cache, bool(args.metrics))
+        else:
+            serve(cache=cache, metrics=bool(args.metrics))
+        return
+    if args.input is None:
+        parser.error('the following arguments are required: input')
+    
+    if args.target_count is not None and args.target_count < 3:
+        parser.error('--target-count must be at least 3')
+    try:
+        canvas = _parse_canvas(args.canvas)
+    except ValueError as e:
+        parser.error(str(e))
+    render_options = dict(num_points=args.num_points, angle_threshold=args.angle_threshold,
+                          target_count=args.target_count, interpolate=args.interpolate,
+                          canvas=canvas, padding=args.padding, work_size=args.work_size,
+                          encoding=args.encoding, compression=args.compression)
     
-    # 如果 output_path 是 "--stdout"，输出 base64 到 stdout
-    if output_path == "--stdout":
-        base64_str = generate_dot_to_dot_base64(input_path, num_points, angle_threshold)
+    if args.batch:
+        if args.output in (None, '-'):
+            parser.error('--batch requires an output directory')
+        inputs = expand_inputs(args.input)
+        if not inputs:
+            parser.error(f'no images match: {args.input}')
+        try:
+            summary = run_batch(inputs, args.output, args.jobs, args.svg, args.force, cache,
+                                log=sys.stdout, **render_options)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.metrics:
+            print(json.dumps({'batch': True, 'input_path': args.input, 'output_path': args.output, **summary}),
+                  file=sys.stderr)
+        if summary['failed']:
+            sys.exit(1)
+        return
+    
+    if args.input == '-' and args.output is None:
+        parser.error('an output path (or - for stdout) is required when reading from stdin')
+    if args.svg and args.output not in (None, '-') and not args.output.lower().endswith('.svg'):
+        parser.error('--svg requires an output path ending in .svg (or - for stdout)')
+    if args.output is None and args.svg:
+        args.output = os.path.splitext(args.input)[0] + '_dots.svg'
+    if args.encoding == 'webp' and (args.output or '').lower().endswith('.png'):
+        parser.error('--encoding webp requires an output path ending in .webp (or - for stdout)')
+    
+    metrics = RunMetrics() if args.metrics else None
+    options = dict(render_options, cache=cache, timings=metrics)
+    if args.output == '-' and args.svg:
+        svg = generate_dot_to_dot_svg(args.input, **options)
+        if svg and args.binary:
+            write_framed(svg)
+        elif svg:
+            sys.stdout.buffer.write(svg)
+            sys.stdout.buffer.write(b'\n')
+        ok = bool(svg)
+    elif args.output == '-' and args.binary:
+        png = generate_dot_to_dot_png(args.input, **options)
+        if png:
+            write_framed(png)
+        ok = bool(png)
+    elif args.output == '-':
+        base64_str = generate_dot_to_dot_base64(args.input, **options)
         if base64_str:
             print(base64_str)  # 输出到 stdout
+        ok = bool(base64_str)
     else:
-        generate_dot_to_dot(input_path, output_path, num_points, angle_threshold)
+        ok = generate_dot_to_dot(args.input, args.output, **options) is not None
+    
+    if metrics is not None:
+        # 单独一行 JSON 写到 stderr，stdout 可能是输出数据
+        ext = os.path.splitext(args.output or '')[1].lower()
+        fmt = 'svg' if args.svg or ext == '.svg' else 'webp' if ext == '.webp' else args.encoding
+        print(json.dumps(metrics.record(input_path=args.input, output_path=args.output, ok=ok, format=fmt)),
+              file=sys.stderr)
+    if not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
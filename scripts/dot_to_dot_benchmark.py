@@ -0,0 +1,692 @@
+"""
+点对点连线图生成器性能测试
+
+使用方法:
+    python scripts/dot_to_dot_benchmark.py fade [-n 次数]
+    python scripts/dot_to_dot_benchmark.py resample [-n 次数]
+    python scripts/dot_to_dot_benchmark.py angle [-n 次数]
+    python scripts/dot_to_dot_benchmark.py serve [-n 次数]
+    python scripts/dot_to_dot_benchmark.py cache [-n 次数]
+    python scripts/dot_to_dot_benchmark.py roi [-n 次数]
+    python scripts/dot_to_dot_benchmark.py canvas [-n 次数]
+    python scripts/dot_to_dot_benchmark.py svg [-n 次数]
+    python scripts/dot_to_dot_benchmark.py labels [-n 次数]
+    python scripts/dot_to_dot_benchmark.py batch [-n 图片数]
+    python scripts/dot_to_dot_benchmark.py encoding [-n 次数] [--inputs 'backend/public/uploads/bigpng/*.png']
+
+    fade: 外轮廓淡化的向量化实现与旧版逐像素循环在 800/1024/2048 输入下的耗时，
+          并校验两者输出逐字节一致（不一致时以非零状态退出）
+    resample: 轮廓弧长均匀采样（一次 cumsum + 批量 searchsorted）与旧版逐点循环在
+          1万~20万点长轮廓上的耗时，校验取点一致，并给出插值模式的耗时
+    angle: 数组版角度过滤与旧版逐三元组循环的耗时并校验结果一致；
+          以及 --target-count 精简（堆）到 10/20/50/100 点的耗时
+    serve: 每次冷启动 Python 进程（stdin 传图）与常驻 --serve 进程的 p50/p99 延迟
+    cache: 结果缓存未命中与命中的耗时（临时缓存目录），并校验命中结果与重新渲染一致
+    roi:  2048px 输入下「整图复制 + 整幅掩码」与「轮廓外接矩形视图 + 原地绘制」在淡化阶段
+          和完整流程中的耗时与峰值内存（tracemalloc），并校验输出一致
+    canvas: 生成 678x900 画布的两种方式：原分辨率出图后再缩放居中（before）与
+          低分辨率检测、按画布分辨率直接绘制（--canvas，after）的耗时与峰值内存，
+          并给出两者编号点在画布上的最大偏差（点数不一致时以非零状态退出）
+    svg:  PNG 与 SVG 输出的大小（含 base64 data URL）与渲染耗时（含仓库中的真实素材），
+          并校验 SVG 可解析且圆点、编号数量与点数一致、灰度线稿的 SVG 比 PNG 小
+    labels: 50/100/200 点页面上旧版「按质心象限放编号」与网格避让布局的耗时，
+          以及编号互相重叠、压住圆点、压住线稿的数量；新布局出现编号重叠或压住圆点、
+          压住线稿多于旧版、或 200 点整页渲染超过 1 秒时以非零状态退出
+    batch: 临时目录中 n 张 1024/2048 线稿分别用 1/2/4 个线程批量生成的吞吐量，
+          校验输出与逐张 render_png 一致、再次运行时全部跳过
+    encoding: 678x900 画布页面在各输出编码（png / gray / palette / webp）和 PNG 压缩级别下的
+          平均大小（含 base64）、编码耗时、与 3 通道 PNG 的最大像素差和退回 3 通道 PNG 的页数（3ch）；
+          png / webp 不是无损或 gray 最大差超过 8 时以非零状态退出
+
+测试图片为程序生成的线稿（闭合外轮廓 + 内部细节），不依赖外部文件；
+encoding 可用 --inputs 指定真实主题素材。
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import struct
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import cv2
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DOT_SCRIPT = os.path.join(SCRIPT_DIR, 'dot_to_dot.py')
+
+sys.path.insert(0, SCRIPT_DIR)
+from dot_to_dot import (fade_outer_contour, resample_contour, filter_points_on_angle,
+                        reduce_to_count, angle_at_point, rad_to_deg, encode_png, read_framed,
+                        render_png, render_svg, open_cache, render_dot_to_dot, prepare_dot_to_dot,
+                        layout_labels, LABEL_DARK_THRESHOLD, run_batch, expand_inputs,
+                        draw_numbered_dots, encode_image, ENCODINGS)
+
+SIZES = (800, 1024, 2048)
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+# svg 模式额外测试的真实素材（不存在时跳过）：(路径, 是否彩色)
+REAL_ASSETS = [(os.path.join(REPO_DIR, 'backend/public/uploads', path), colour) for path, colour in (
+    ('Creative_Prompt/space/blank_sign/rocket_sign.png', False),
+    ('letters/mixed/W_w_mixed_tracing.png', False),
+    ('bigpng/Apple.png', True),
+)]
+
+
+def synthetic_line_art(size: int, seed: int = 0) -> np.ndarray:
+    """生成 size 高、宽高比 4:5 的黑白线稿：不规则闭合外轮廓 + 眼睛和嘴巴"""
+    rng = np.random.default_rng(seed)
+    img = np.full((size, int(size * 0.8), 3), 255, dtype=np.uint8)
+    h, w = img.shape[:2]
+    angles = np.linspace(0, 2 * math.pi, 14, endpoint=False)
+    radii = rng.uniform(0.25, 0.42, len(angles)) * min(h, w)
+    outline = np.stack([w / 2 + radii * np.cos(angles), h / 2 + radii * np.sin(angles)], axis=1)
+    thickness = max(2, size // 150)
+    cv2.polylines(img, [outline.astype(np.int32)], True, (0, 0, 0), thickness, cv2.LINE_AA)
+    cv2.circle(img, (w // 2 - size // 12, h // 2 - size // 12), size // 25, (0, 0, 0), thickness)
+    cv2.circle(img, (w // 2 + size // 12, h // 2 - size // 12), size // 25, (0, 0, 0), thickness)
+    cv2.ellipse(img, (w // 2, h // 2 + size // 12), (size // 10, size // 20), 0, 0, 180, (0, 0, 0), thickness)
+    return img
+
+
+def _main_contour(gray):
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return max(contours, key=cv2.contourArea)
+
+
+def _legacy_fade(output, gray, contour):
+    """旧版逐像素循环，作为回归基准"""
+    outer_mask = np.zeros(gray.shape, dtype=np.uint8)
+    cv2.drawContours(outer_mask, [contour], -1, 255, thickness=30)
+    for y in range(output.shape[0]):
+        for x in range(output.shape[1]):
+            if outer_mask[y, x] == 255 and gray[y, x] < 200:
+                output[y, x] = [230, 230, 230]
+    return output
+
+
+def bench_fade(runs: int) -> bool:
+    """向量化淡化 vs 逐像素循环（循环版本只跑一次）"""
+    passed = True
+    print(f'{"size":>6} {"loop ms":>10} {"numpy ms":>10} {"speedup":>8} {"identical":>10}')
+    for size in SIZES:
+        img = synthetic_line_art(size, seed=size)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        contour = _main_contour(gray)
+
+        t0 = time.perf_counter()
+        expected = _legacy_fade(img.copy(), gray, contour)
+        loop = time.perf_counter() - t0
+
+        samples = []
+        for _ in range(runs):
+            output = img.copy()
+            t0 = time.perf_counter()
+            fade_outer_contour(output, gray, contour)
+            samples.append(time.perf_counter() - t0)
+        vectorized = statistics.median(samples)
+
+        identical = np.array_equal(output, expected)
+        passed = passed and identical
+        print(f'{size:>6} {loop * 1000:>10.1f} {vectorized * 1000:>10.2f} {loop / vectorized:>7.0f}x '
+              f'{"OK" if identical else "FAIL":>10}')
+    return passed
+
+
+def synthetic_contour(length: int, seed: int = 0) -> np.ndarray:
+    """沿不规则闭合曲线取 length 个整数坐标点（相邻点相距不超过 1 像素，近似 CHAIN_APPROX_NONE 的输出）"""
+    radius = length / (2 * math.pi * 1.1)
+    angles = np.linspace(0, 2 * math.pi, length, endpoint=False)
+    wobble = 1 + 0.05 * np.sin(angles * np.random.default_rng(seed).integers(3, 9))
+    points = np.stack([radius * wobble * np.cos(angles), radius * wobble * np.sin(angles)], axis=1)
+    return np.round(points + radius * 1.2).astype(np.int32)
+
+
+def _legacy_resample(contour_points, num_points):
+    """旧版逐点累加弧长 + 逐个 searchsorted，作为回归基准"""
+    total_length = cv2.arcLength(contour_points.reshape(-1, 1, 2), closed=True)
+    cumulative_length = [0]
+    for i in range(1, len(contour_points)):
+        dist = np.linalg.norm(contour_points[i] - contour_points[i - 1])
+        cumulative_length.append(cumulative_length[-1] + dist)
+    cumulative_length = np.array(cumulative_length)
+
+    step = total_length / num_points
+    sampled_points = []
+    for i in range(num_points):
+        idx = np.searchsorted(cumulative_length, i * step)
+        idx = min(idx, len(contour_points) - 1)
+        sampled_points.append(contour_points[idx].tolist())
+    return sampled_points
+
+
+def bench_resample(runs: int, num_points: int = 200) -> bool:
+    """长轮廓弧长采样：旧版循环 vs 向量化（取顶点 / 插值）"""
+    passed = True
+    print(f'{"points":>7} {"loop ms":>10} {"numpy ms":>10} {"interp ms":>10} {"speedup":>8} {"identical":>10}')
+    for length in (10_000, 50_000, 200_000):
+        contour = synthetic_contour(length, seed=length)
+
+        t0 = time.perf_counter()
+        expected = _legacy_resample(contour, num_points)
+        loop = time.perf_counter() - t0
+
+        timings = {}
+        for interpolate in (False, True):
+            samples = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                sampled = resample_contour(contour, num_points, interpolate=interpolate)
+                samples.append(time.perf_counter() - t0)
+            timings[interpolate] = statistics.median(samples)
+            if not interpolate:
+                identical = sampled == expected
+
+        passed = passed and identical
+        print(f'{length:>7} {loop * 1000:>10.1f} {timings[False] * 1000:>10.2f} {timings[True] * 1000:>10.2f} '
+              f'{loop / timings[False]:>7.0f}x {"OK" if identical else "FAIL":>10}')
+    return passed
+
+
+def _legacy_filter(points, angle_threshold):
+    """旧版逐三元组循环的角度过滤，作为回归基准"""
+    excluded_indices = set()
+    i = 0
+    while i < len(points) - 2:
+        angle = rad_to_deg(angle_at_point(points[i], points[i + 1], points[i + 2]))
+        if abs(180 - angle) < angle_threshold:
+            excluded_indices.add(i + 1)
+            i += 1
+        i += 1
+    return [p for i, p in enumerate(points) if i not in excluded_indices]
+
+
+def bench_angle(runs: int) -> bool:
+    """角度过滤（循环 vs 数组）+ 精确点数精简"""
+    passed = True
+    print(f'{"points":>7} {"loop ms":>10} {"numpy ms":>10} {"speedup":>8} {"identical":>10}')
+    for length in (1_000, 10_000, 100_000):
+        contour = synthetic_contour(length * 4, seed=length)
+        points = resample_contour(contour, length)
+
+        t0 = time.perf_counter()
+        expected = _legacy_filter(points, 20)
+        loop = time.perf_counter() - t0
+
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            filtered = filter_points_on_angle(points, 20)
+            samples.append(time.perf_counter() - t0)
+        vectorized = statistics.median(samples)
+
+        identical = filtered == expected
+        passed = passed and identical
+        print(f'{length:>7} {loop * 1000:>10.1f} {vectorized * 1000:>10.2f} {loop / vectorized:>7.0f}x '
+              f'{"OK" if identical else "FAIL":>10}')
+
+    print(f'\n{"points":>7} ' + ' '.join(f'{f"-> {n} ms":>10}' for n in (10, 20, 50, 100)))
+    for length in (200, 1_000, 10_000):
+        points = resample_contour(synthetic_contour(length * 4, seed=length), length)
+        timings = []
+        for target in (10, 20, 50, 100):
+            t0 = time.perf_counter()
+            reduced = reduce_to_count(points, target)
+            timings.append(time.perf_counter() - t0)
+            if len(reduced) != target:
+                print(f'count mismatch: {length} -> {target} gave {len(reduced)}')
+                passed = False
+        print(f'{length:>7} ' + ' '.join(f'{t * 1000:>10.2f}' for t in timings))
+    return passed
+
+
+def _summary(samples):
+    """返回 (p50, p99, 平均) 毫秒"""
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return statistics.median(ordered) * 1000, p99 * 1000, statistics.mean(ordered) * 1000
+
+
+def _frame(data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + data
+
+
+def bench_serve(runs: int):
+    """冷启动 vs 常驻进程（两种方式都通过 stdin 传入图片字节）"""
+    print(f'{"size":>6} {"mode":<8} {"p50 ms":>9} {"p99 ms":>9} {"mean ms":>9}')
+    for size in (800, 1024):
+        image = encode_png(synthetic_line_art(size, seed=size))
+
+        cold = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, DOT_SCRIPT, '-', '-', '--binary'], input=image,
+                           check=True, capture_output=True)
+            cold.append(time.perf_counter() - t0)
+
+        proc = subprocess.Popen([sys.executable, DOT_SCRIPT, '--serve'],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            warm = []
+            # 第一次请求包含解释器启动，不计入
+            for i in range(runs + 1):
+                t0 = time.perf_counter()
+                proc.stdin.write(_frame(json.dumps({'id': i}).encode('utf-8')) + _frame(image))
+                proc.stdin.flush()
+                response = json.loads(read_framed(proc.stdout))
+                read_framed(proc.stdout)
+                if i:
+                    warm.append(time.perf_counter() - t0)
+                assert response['ok'], response
+        finally:
+            proc.stdin.close()
+            proc.wait()
+
+        for mode, samples in (('cold', cold), ('worker', warm)):
+            p50, p99, mean = _summary(samples)
+            print(f'{size:>6} {mode:<8} {p50:>9.1f} {p99:>9.1f} {mean:>9.1f}')
+
+
+def bench_cache(runs: int) -> bool:
+    """同一批输入先全部未命中、再全部命中"""
+    passed = True
+    print(f'{"size":>6} {"miss ms":>9} {"hit ms":>9} {"identical":>10}')
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as quiet:
+        cache = open_cache(directory, 64)
+        for size in SIZES:
+            images = [encode_png(synthetic_line_art(size, seed=size + i)) for i in range(runs)]
+            misses, hits, rendered = [], [], []
+            for image in images:
+                t0 = time.perf_counter()
+                png, cached = render_png(image, cache, log=quiet)
+                misses.append(time.perf_counter() - t0)
+                rendered.append(png)
+                passed = passed and not cached
+            identical = True
+            for image, expected in zip(images, rendered):
+                t0 = time.perf_counter()
+                png, cached = render_png(image, cache)
+                hits.append(time.perf_counter() - t0)
+                identical = identical and cached and png == expected
+            passed = passed and identical
+            print(f'{size:>6} {statistics.median(misses) * 1000:>9.1f} {statistics.median(hits) * 1000:>9.2f} '
+                  f'{"OK" if identical else "FAIL":>10}')
+        print(f'cache stats: {cache.stats()}')
+    return passed
+
+
+def _full_frame_fade(output, gray, contour, thickness: int = 30, color: int = 230):
+    """改为外接矩形之前的实现：整幅掩码"""
+    outer_mask = np.zeros(gray.shape, dtype=np.uint8)
+    cv2.drawContours(outer_mask, [contour], -1, 255, thickness=thickness)
+    output[(outer_mask == 255) & (gray < 200)] = color
+    return output
+
+
+def _measure(fn, setup, runs: int):
+    """返回 (中位耗时 ms, 峰值内存 KiB)；setup() 的输入在计时/计量之外准备，峰值内存单独一轮测量"""
+    samples = []
+    for _ in range(runs):
+        arg = setup()
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t0)
+    arg = setup()
+    tracemalloc.start()
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(samples) * 1000, peak / 1024
+
+
+def bench_roi(runs: int) -> bool:
+    """
+    before: 复制整图 + 整幅掩码；after: 外接矩形视图 + 原地绘制
+    full 为占满画面的 2048 线稿，small 为 1024 线稿居中放在 2048 画布上（Gemini 输出常见的留白）
+    """
+    import dot_to_dot
+
+    full = synthetic_line_art(2048, seed=2048)
+    small = np.full_like(full, 255)
+    inner = synthetic_line_art(1024, seed=1024)
+    top, left = (full.shape[0] - inner.shape[0]) // 2, (full.shape[1] - inner.shape[1]) // 2
+    small[top:top + inner.shape[0], left:left + inner.shape[1]] = inner
+
+    passed = True
+    print(f'{"image":<6} {"stage":<8} {"before ms":>10} {"after ms":>10} {"before KiB":>11} {"after KiB":>11}')
+    with open(os.devnull, 'w') as quiet:
+        for name, img in (('full', full), ('small', small)):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            contour = _main_contour(gray)
+
+            before = _measure(lambda arr: _full_frame_fade(arr.copy(), gray, contour), lambda: img, runs)
+            after = _measure(lambda arr: fade_outer_contour(arr, gray, contour), img.copy, runs)
+            print(f'{name:<6} {"fade":<8} {before[0]:>10.2f} {after[0]:>10.2f} {before[1]:>11.0f} {after[1]:>11.0f}')
+
+            # 完整流程：before 临时换回整幅掩码并保留整图复制
+            dot_to_dot.fade_outer_contour = _full_frame_fade
+            try:
+                expected = render_dot_to_dot(img, log=quiet)
+                before = _measure(lambda arr: render_dot_to_dot(arr, log=quiet), lambda: img, runs)
+            finally:
+                dot_to_dot.fade_outer_contour = fade_outer_contour
+            identical = np.array_equal(expected, render_dot_to_dot(img.copy(), log=quiet, inplace=True))
+            after = _measure(lambda arr: render_dot_to_dot(arr, log=quiet, inplace=True), img.copy, runs)
+            print(f'{name:<6} {"render":<8} {before[0]:>10.2f} {after[0]:>10.2f} {before[1]:>11.0f} {after[1]:>11.0f}')
+            passed = passed and identical
+    print(f'output identical: {"OK" if passed else "FAIL"}')
+    return passed
+
+
+CANVAS = (678, 900)
+
+
+def _render_then_fit(img, quiet, padding: int = 40):
+    """--canvas 之前的做法：原分辨率（不足 800 先放大）出图，再按 imagen_dot_to_dot 的方式缩放居中"""
+    dots = render_dot_to_dot(img, log=quiet)
+    h, w = dots.shape[:2]
+    scale = min((CANVAS[0] - padding * 2) / w, (CANVAS[1] - padding * 2) / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+    canvas = np.full((CANVAS[1], CANVAS[0], 3), 255, dtype=np.uint8)
+    x_offset, y_offset = (CANVAS[0] - new_w) // 2, (CANVAS[1] - new_h) // 2
+    canvas[y_offset:y_offset + new_h, x_offset:x_offset + new_w] = cv2.resize(
+        dots, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return canvas
+
+
+def _canvas_points_before(img, quiet, padding: int = 40):
+    """旧做法中编号点最终落在画布上的坐标"""
+    output, points = prepare_dot_to_dot(img, target_count=20, log=quiet)
+    h, w = output.shape[:2]
+    scale = min((CANVAS[0] - padding * 2) / w, (CANVAS[1] - padding * 2) / h)
+    x_offset, y_offset = (CANVAS[0] - int(w * scale)) // 2, (CANVAS[1] - int(h * scale)) // 2
+    return np.array(points, dtype=np.float64) * scale + (x_offset, y_offset)
+
+
+def bench_canvas(runs: int) -> bool:
+    """before: 原分辨率渲染 + 缩放居中；after: render_dot_to_dot(canvas=...)"""
+    passed = True
+    print(f'{"input":<6} {"before ms":>10} {"after ms":>10} {"before KiB":>11} {"after KiB":>11} {"max dev px":>11}')
+    with open(os.devnull, 'w') as quiet:
+        for size in (512,) + SIZES:
+            img = synthetic_line_art(size, seed=size)
+            before = _measure(lambda arr: _render_then_fit(arr, quiet), lambda: img, runs)
+            after = _measure(lambda arr: render_dot_to_dot(arr, log=quiet, canvas=CANVAS), lambda: img, runs)
+
+            old_points = _canvas_points_before(img, quiet)
+            new_points = np.array(prepare_dot_to_dot(img, target_count=20, log=quiet, canvas=CANVAS)[1])
+            if len(old_points) != len(new_points):
+                passed = False
+                deviation = float('nan')
+            else:
+                # 起点可能不同，按最近点比较
+                dist = np.linalg.norm(old_points[:, None] - new_points[None], axis=2)
+                deviation = dist.min(axis=1).max()
+            print(f'{size:<6} {before[0]:>10.2f} {after[0]:>10.2f} {before[1]:>11.0f} {after[1]:>11.0f} {deviation:>11.2f}')
+    print(f'point count identical: {"OK" if passed else "FAIL"}')
+    return passed
+
+
+def _timed(render, image: bytes, quiet, canvas) -> float:
+    t0 = time.perf_counter()
+    render(image, log=quiet, canvas=canvas)
+    return time.perf_counter() - t0
+
+
+def _b64_len(data: bytes) -> int:
+    """base64 data URL 的长度（浏览器实际收到的大小）"""
+    return (len(data) + 2) // 3 * 4
+
+
+def bench_svg(runs: int) -> bool:
+    """
+    原分辨率与 678x900 画布两种输出下，PNG 与 SVG 的大小和耗时（不经过缓存）；
+    除程序生成的线稿外，也测仓库里的真实素材（近灰度扫描件、描红字帖、彩色插图）
+    """
+    passed = True
+    svg_ns = '{http://www.w3.org/2000/svg}'
+    inputs = [(str(size), encode_png(synthetic_line_art(size, seed=size)), False) for size in SIZES]
+    for path, colour in REAL_ASSETS:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                inputs.append((os.path.splitext(os.path.basename(path))[0][:18], f.read(), colour))
+    print(f'{"input":<18} {"canvas":<8} {"png KiB":>8} {"svg KiB":>8} {"png b64":>8} {"svg b64":>8} '
+          f'{"png ms":>7} {"svg ms":>7} {"valid":>6}')
+    with open(os.devnull, 'w') as quiet:
+        for name, image, colour in inputs:
+            for canvas in (None, CANVAS):
+                png_ms = _summary([_timed(render_png, image, quiet, canvas) for _ in range(runs)])[0]
+                svg_ms = _summary([_timed(render_svg, image, quiet, canvas) for _ in range(runs)])[0]
+                png = render_png(image, log=quiet, canvas=canvas)[0]
+                svg = render_svg(image, log=quiet, canvas=canvas)[0]
+
+                # 点数以 PNG 流程选出的点为准
+                count = len(prepare_dot_to_dot(cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR),
+                                               log=quiet, canvas=canvas)[1])
+                try:
+                    root = ET.fromstring(svg)
+                    valid = (len(root.findall(f'.//{svg_ns}circle')) == count
+                             and len(root.findall(f'.//{svg_ns}text')) == count)
+                except ET.ParseError:
+                    valid = False
+                # 灰度线稿的 SVG 必须比 PNG 小；彩色线稿只能原样内嵌，多出 base64 的开销
+                passed = passed and valid and (colour or len(svg) < len(png))
+
+                label = 'x'.join(map(str, canvas)) if canvas else 'native'
+                print(f'{name:<18} {label:<8} {len(png) / 1024:>8.1f} {len(svg) / 1024:>8.1f} '
+                      f'{_b64_len(png) / 1024:>8.1f} {_b64_len(svg) / 1024:>8.1f} '
+                      f'{png_ms:>7.2f} {svg_ms:>7.2f} {"OK" if valid else "FAIL":>6}')
+    return passed
+
+
+def _legacy_layout(output, points):
+    """网格避让之前的编号位置：只按点相对质心的象限决定"""
+    shape = output.shape
+    dot_radius = max(4, int(min(shape[:2]) / 150))
+    font_scale = max(0.35, min(shape[:2]) / 1200) * (0.75 if len(points) > 10 else 1)
+    font_thickness = max(1, int(font_scale * 2))
+    cx = int(np.mean([p[0] for p in points]))
+    cy = int(np.mean([p[1] for p in points]))
+    labels = []
+    for i, point in enumerate(points):
+        x, y = int(point[0]), int(point[1])
+        label = str(i + 1)
+        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
+        offset = dot_radius + 5
+        text_x = x + offset if x > cx else x - offset - text_size[0]
+        text_y = y - offset if y < cy else y + offset + text_size[1]
+        text_x = max(5, min(text_x, shape[1] - text_size[0] - 5))
+        text_y = max(text_size[1] + 5, min(text_y, shape[0] - 5))
+        labels.append((label, (x, y), (text_x, text_y), text_size))
+    return dot_radius, font_scale, font_thickness, labels
+
+
+def _label_conflicts(output, layout):
+    """返回 (编号互相重叠的对数, 压住圆点的编号数, 压住线稿的编号数)，逐对比较"""
+    dot_radius, _, _, labels = layout
+    gray = cv2.cvtColor(output, cv2.COLOR_BGR2GRAY)
+    boxes = [(tx, ty - th, tx + tw, ty) for _, _, (tx, ty), (tw, th) in labels]
+    dots = [(x - dot_radius, y - dot_radius, x + dot_radius, y + dot_radius) for _, (x, y), _, _ in labels]
+
+    def overlap(a, b):
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+    pairs = sum(overlap(a, b) for i, a in enumerate(boxes) for b in boxes[i + 1:])
+    on_dots = sum(any(overlap(box, dot) for dot in dots) for box in boxes)
+    on_art = sum(bool((gray[max(0, y0):y1, max(0, x0):x1] < LABEL_DARK_THRESHOLD).any())
+                 for x0, y0, x1, y1 in boxes)
+    return pairs, on_dots, on_art
+
+
+def _median_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def bench_labels(runs: int) -> bool:
+    """2048 线稿、678x900 画布：旧版与网格布局的编号冲突数与耗时"""
+    passed = True
+    print(f'{"dots":>5} {"layout":<7} {"ms":>7} {"label pairs":>12} {"on dots":>8} {"on art":>7} {"page ms":>8}')
+    with open(os.devnull, 'w') as quiet:
+        image = encode_png(synthetic_line_art(2048, seed=2048))
+        img = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+        for count in (50, 100, 200):
+            output, points = prepare_dot_to_dot(img, target_count=count, log=quiet, canvas=CANVAS)
+            page_ms = _median_ms(lambda: render_png(image, log=quiet, canvas=CANVAS, target_count=count), runs)
+            results = {}
+            for name, layout in (('legacy', _legacy_layout), ('grid', layout_labels)):
+                elapsed = _median_ms(lambda: layout(output, points), runs)
+                results[name] = _label_conflicts(output, layout(output, points))
+                print(f'{count:>5} {name:<7} {elapsed:>7.2f} {results[name][0]:>12} {results[name][1]:>8} '
+                      f'{results[name][2]:>7} {page_ms if name == "grid" else float("nan"):>8.1f}')
+            pairs, on_dots, on_art = results['grid']
+            passed = passed and pairs == 0 and on_dots == 0 and on_art <= results['legacy'][2]
+            if count == 200:
+                passed = passed and page_ms < 1000
+    print(f'no overlapping labels, 200-dot page < 1 s: {"OK" if passed else "FAIL"}')
+    return passed
+
+
+def bench_batch(count: int) -> bool:
+    """同一批输入分别用 1/2/4 个线程生成（force=True），比较吞吐量"""
+    passed = True
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f'{count} images, {cores} CPU cores available')
+    print(f'{"threads":>8} {"seconds":>8} {"img/s":>7} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as quiet:
+        input_dir, output_dir = os.path.join(directory, 'in'), os.path.join(directory, 'out')
+        os.makedirs(input_dir)
+        for i in range(count):
+            with open(os.path.join(input_dir, f'art{i:03d}.png'), 'wb') as f:
+                f.write(encode_png(synthetic_line_art((1024, 2048)[i % 2], seed=i)))
+        inputs = expand_inputs(input_dir)
+
+        baseline = None
+        for workers in (1, 2, 4):
+            summary = run_batch(inputs, output_dir, workers, force=True, log=quiet, target_count=20)
+            baseline = baseline or summary['images_per_sec']
+            passed = passed and summary['images'] == count
+            print(f'{workers:>8} {summary["seconds"]:>8.2f} {summary["images_per_sec"]:>7.1f} '
+                  f'{summary["images_per_sec"] / baseline:>7.2f}x')
+
+        identical = True
+        for path in inputs:
+            with open(path, 'rb') as f:
+                expected = render_png(f.read(), log=quiet, target_count=20)[0]
+            name = os.path.splitext(os.path.basename(path))[0] + '_dots.png'
+            with open(os.path.join(output_dir, name), 'rb') as f:
+                identical = identical and f.read() == expected
+        rerun = run_batch(inputs, output_dir, log=quiet, target_count=20)
+        skipped = rerun['skipped'] == count and rerun['images'] == 0
+        passed = passed and identical and skipped
+        print('stage ms per image (1 thread):')
+        summary = run_batch(inputs, output_dir, 1, force=True, log=quiet, target_count=20)
+        print('   ' + ', '.join(f'{name} {seconds * 1000 / count:.1f}' for name, seconds in summary['stages'].items()))
+    print(f'output identical: {"OK" if identical else "FAIL"}, rerun skipped: {"OK" if skipped else "FAIL"}')
+    return passed
+
+
+# gray 视为「视觉无损」的最大像素差
+GRAY_MAX_DIFF = 8
+
+
+def bench_encoding(runs: int, pattern: str = None) -> bool:
+    """678x900 画布页面（20 点）在各编码和压缩级别下的平均大小、编码耗时与像素误差"""
+    with open(os.devnull, 'w') as quiet:
+        if pattern:
+            images = [cv2.imread(path, cv2.IMREAD_COLOR) for path in expand_inputs(pattern)]
+        else:
+            images = [synthetic_line_art(size, seed=size) for size in SIZES]
+        pages = []
+        for img in images:
+            prepared = prepare_dot_to_dot(img, target_count=20, log=quiet, canvas=CANVAS)
+            if prepared is None:
+                continue
+            output, points = prepared
+            draw_numbered_dots(output, points)
+            pages.append(output)
+    print(f'{len(pages)} pages at {CANVAS[0]}x{CANVAS[1]}')
+
+    passed = True
+    baseline = None
+    print(f'{"encoding":<9} {"level":>6} {"KiB":>7} {"b64 KiB":>8} {"vs png":>7} {"encode ms":>10} {"max diff":>9} '
+          f'{"3ch":>4}')
+    for encoding in ENCODINGS:
+        # WebP 无损模式没有压缩级别参数
+        for compression in ((None,) if encoding == 'webp' else (None, 1, 6, 9)):
+            sizes, b64_sizes, samples, diff, rgb = [], [], [], 0, 0
+            for output in pages:
+                data = encode_image(output, encoding, compression)
+                samples.append(_median_ms(lambda: encode_image(output, encoding, compression), runs))
+                sizes.append(len(data))
+                b64_sizes.append(_b64_len(data))
+                decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                diff = max(diff, int(cv2.absdiff(decoded, output).max()))
+                # PNG 颜色类型 2：彩色线稿退回了 3 通道 PNG
+                rgb += data.startswith(b'\x89PNG') and data[25] == 2
+            size = statistics.mean(sizes)
+            baseline = baseline or size
+            level = 'default' if compression is None else str(compression)
+            print(f'{encoding:<9} {level:>6} {size / 1024:>7.1f} {statistics.mean(b64_sizes) / 1024:>8.1f} '
+                  f'{size / baseline:>6.2f}x {statistics.median(samples):>10.2f} {diff:>9} {rgb:>4}')
+            if encoding in ('png', 'webp'):
+                passed = passed and diff == 0
+            elif encoding == 'gray':
+                passed = passed and diff <= GRAY_MAX_DIFF
+    print(f'png/webp lossless, gray max diff <= {GRAY_MAX_DIFF}: {"OK" if passed else "FAIL"}')
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='点对点连线图生成器性能测试')
+    parser.add_argument('mode', choices=['fade', 'resample', 'angle', 'serve', 'cache', 'roi', 'canvas', 'svg', 'labels', 'batch', 'encoding'], help='测试项目')
+    parser.add_argument('-n', '--runs', type=int, default=20, help='每项重复次数')
+    parser.add_argument('--inputs', help='encoding 使用的图片目录或 glob（缺省为程序生成的线稿）')
+    args = parser.parse_args()
+
+    if args.mode == 'fade':
+        if not bench_fade(args.runs):
+            sys.exit(1)
+    elif args.mode == 'resample':
+        if not bench_resample(args.runs):
+            sys.exit(1)
+    elif args.mode == 'angle':
+        if not bench_angle(args.runs):
+            sys.exit(1)
+    elif args.mode == 'serve':
+        bench_serve(args.runs)
+    elif args.mode == 'cache':
+        if not bench_cache(args.runs):
+            sys.exit(1)
+    elif args.mode == 'roi':
+        if not bench_roi(args.runs):
+            sys.exit(1)
+    elif args.mode == 'canvas':
+        if not bench_canvas(args.runs):
+            sys.exit(1)
+    elif args.mode == 'svg':
+        if not bench_svg(args.runs):
+            sys.exit(1)
+    elif args.mode == 'labels':
+        if not bench_labels(args.runs):
+            sys.exit(1)
+    elif args.mode == 'batch':
+        if not bench_batch(args.runs):
+            sys.exit(1)
+    elif args.mode == 'encoding':
+        if not bench_encoding(args.runs, args.inputs):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -92,49 +92,6 @@ def call_imagen_api(prompt: str, api_key: str) -> bytes:
     raise Exception("响应中未找到图片数据")
 
 
-def resize_and_center_image(input_path: str, output_path: str, 
-                            target_width: int = CANVAS_WIDTH, 
-                            target_height: int = CANVAS_HEIGHT):
-    """
-    将图片等比缩放并居中放入目标尺寸的白色画布中
-    """
-    import cv2
-    import numpy as np
-    
-    img = cv2.imread(input_path)
-    if img is None:
-        raise Exception(f"无法读取图片: {input_path}")
-    
-    h, w = img.shape[:2]
-    
-    # 计算缩放比例（保持宽高比，留一些边距）
-    padding = 40  # 内边距
-    available_width = target_width - padding * 2
-    available_height = target_height - padding * 2
-    
-    scale = min(available_width / w, available_height / h)
-    
-    new_w = int(w * scale)
-    new_h = int(h * scale)
-    
-    # 缩放图片
-    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-    
-    # 创建白色画布
-    canvas = np.ones((target_height, target_width, 3), dtype=np.uint8) * 255
-    
-    # 计算居中位置
-    x_offset = (target_width - new_w) // 2
-    y_offset = (target_height - new_h) // 2
-    
-    # 将图片放入画布中心
-    canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
-    
-    cv2.imwrite(output_path, canvas)
-    print(f"   ✅ 图片已居中: {output_path}")
-    return output_path
-
-
 def main():
     # 获取脚本所在目录的父目录（项目根目录）
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -192,19 +149,16 @@ def main():
                 f.write(image_bytes)
             print(f"   💾 原图已保存: {original_path}")
         
-        # 步骤2: 使用 dot_to_dot.py 处理
+        # 步骤2: 使用 dot_to_dot.py 处理，直接按 canvas 尺寸居中绘制
+        # （低分辨率检测轮廓，点和编号按最终分辨率绘制，不再先放大再缩小）
         print(f"\n🔵 正在生成点对点图...")
-        dots_path = os.path.join(output_dir, f"imagen_dots_{timestamp}.png")
-        generate_dot_to_dot(original_path, dots_path, args.num_points, args.angle_threshold)
-        
-        # 步骤3: 居中放入 canvas 尺寸
-        print(f"\n📐 正在调整尺寸并居中...")
         final_path = os.path.join(output_dir, f"number_path_{timestamp}.png")
-        resize_and_center_image(dots_path, final_path, CANVAS_WIDTH, CANVAS_HEIGHT)
+        if generate_dot_to_dot(original_path, final_path, args.num_points, args.angle_threshold,
+                               canvas=(CANVAS_WIDTH, CANVAS_HEIGHT)) is None:
+            raise Exception("点对点图生成失败")
         
         print(f"\n✅ 完成！")
         print(f"   原图: {original_path}")
-        print(f"   点对点: {dots_path}")
         print(f"   最终图: {final_path}")
         
     except Exception as e:
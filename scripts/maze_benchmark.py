@@ -0,0 +1,266 @@
+"""
+迷宫生成器性能测试
+
+使用方法:
+    python scripts/maze_benchmark.py serve [-n 次数]
+
+    python scripts/maze_benchmark.py grid
+    python scripts/maze_benchmark.py scaling
+    python scripts/maze_benchmark.py svg
+    python scripts/maze_benchmark.py algorithms
+    python scripts/maze_benchmark.py png
+
+    serve: 对比每次冷启动 Python 进程与常驻 --serve 进程的延迟/吞吐（easy/medium/hard）
+    grid:  各算法在 10/22/100/300 尺寸下的生成耗时与峰值内存
+    scaling: 各算法 125~1000 尺寸下的单元格平均耗时（3 次中位数），250 以上尺寸超出线性增长容差时以非零状态退出
+    svg:   校验合并墙壁后的紧凑 SVG 与旧版逐段 <line> 几何一致，并对比各难度的字节数
+    algorithms: 向量化算法（binary_tree/sidewinder/eller）与 dfs/kruskal 在相同尺寸下的耗时
+    png:   直接栅格化 PNG 与「先出 SVG 再栅格化」（需安装 cairosvg）在 300 DPI Letter 页面下的耗时
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import base64
+import argparse
+import statistics
+import threading
+import subprocess
+import tracemalloc
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MAZE_SCRIPT = os.path.join(SCRIPT_DIR, 'maze_generator.py')
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+sys.path.insert(0, SCRIPT_DIR)
+from maze_generator import MazeGenerator, ALGORITHMS, DIFFICULTY_CONFIG
+
+
+def _summary(samples):
+    """返回 (p50, p99, 平均) 毫秒"""
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return statistics.median(ordered) * 1000, p99 * 1000, statistics.mean(ordered) * 1000
+
+
+def bench_serve(runs: int):
+    """冷启动 vs 常驻进程"""
+    print(f'{"difficulty":<10} {"mode":<8} {"p50 ms":>9} {"p99 ms":>9} {"mean ms":>9} {"mazes/s":>9}')
+    for difficulty in DIFFICULTIES:
+        cold = []
+        for i in range(runs):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, MAZE_SCRIPT, '-d', difficulty, '--stdout'],
+                           check=True, capture_output=True)
+            cold.append(time.perf_counter() - t0)
+
+        proc = subprocess.Popen([sys.executable, MAZE_SCRIPT, '--serve'],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            # 预热：第一次请求包含解释器启动
+            proc.stdin.write(json.dumps({'id': 0, 'difficulty': difficulty}) + '\n')
+            proc.stdin.flush()
+            proc.stdout.readline()
+
+            warm = []
+            for i in range(runs):
+                t0 = time.perf_counter()
+                proc.stdin.write(json.dumps({'id': i + 1, 'difficulty': difficulty}) + '\n')
+                proc.stdin.flush()
+                response = json.loads(proc.stdout.readline())
+                warm.append(time.perf_counter() - t0)
+                assert response['ok'], response
+
+            # 流水线：连续写入全部请求，响应由另一个线程读取
+            # （同一线程先写完再读时，-n 较大会把管道写满，两边互相等待）
+            t0 = time.perf_counter()
+            reader = threading.Thread(target=lambda: [proc.stdout.readline() for _ in range(runs)])
+            reader.start()
+            for i in range(runs):
+                proc.stdin.write(json.dumps({'id': i, 'difficulty': difficulty}) + '\n')
+            proc.stdin.flush()
+            reader.join()
+            pipelined = time.perf_counter() - t0
+        finally:
+            proc.stdin.close()
+            proc.wait()
+
+        for mode, samples in (('cold', cold), ('worker', warm)):
+            p50, p99, mean = _summary(samples)
+            print(f'{difficulty:<10} {mode:<8} {p50:>9.1f} {p99:>9.1f} {mean:>9.1f} {len(samples) / sum(samples):>9.1f}')
+        print(f'{difficulty:<10} {"pipeline":<8} {"":>9} {"":>9} {pipelined / runs * 1000:>9.1f} {runs / pipelined:>9.1f}')
+
+
+def bench_grid(sizes=(10, 22, 100, 300)):
+    """生成 + 求解的耗时与峰值内存（峰值内存单独一轮测量，避免 tracemalloc 影响计时）"""
+    print(f'{"size":>5} {"algorithm":<9} {"time ms":>10} {"peak KiB":>10}')
+    for size in sizes:
+        for algorithm in ALGORITHMS:
+            t0 = time.perf_counter()
+            MazeGenerator(size, seed=1).generate(algorithm)
+            elapsed = time.perf_counter() - t0
+
+            tracemalloc.start()
+            MazeGenerator(size, seed=1).generate(algorithm)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'{size:>5} {algorithm:<9} {elapsed * 1000:>10.1f} {peak / 1024:>10.0f}')
+
+
+def bench_scaling(sizes=(125, 250, 500, 1000), runs: int = 3, tolerance: float = 2.0) -> bool:
+    """
+    检查耗时随单元格数近似线性增长：每个尺寸取 runs 次的中位数，
+    除最小尺寸外（只有几毫秒，受计时抖动影响大），最大与最小的单格耗时之比不超过 tolerance
+    """
+    import numpy  # noqa: F401  预先导入，避免计入第一次向量化算法的耗时
+
+    print(f'{"algorithm":<12} ' + ' '.join(f'{size:>9}' for size in sizes) + '   (us/cell, median)')
+    passed = True
+    for algorithm in ALGORITHMS:
+        per_cell = []
+        for size in sizes:
+            samples = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                MazeGenerator(size, seed=1).generate(algorithm)
+                samples.append(time.perf_counter() - t0)
+            per_cell.append(statistics.median(samples) / (size * size) * 1e6)
+        ratio = max(per_cell[1:]) / min(per_cell[1:])
+        ok = ratio <= tolerance
+        passed = passed and ok
+        print(f'{algorithm:<12} ' + ' '.join(f'{t:>9.2f}' for t in per_cell)
+              + f'   ratio={ratio:.2f} {"OK" if ok else "FAIL"}')
+    return passed
+
+
+def _unit_segments(svg: str, cell_size: int) -> set:
+    """把 SVG 中的墙壁拆成单元格长度的线段集合，用于比较几何"""
+    segments = set()
+
+    def add(x1, y1, x2, y2):
+        steps = max(abs(x2 - x1), abs(y2 - y1)) // cell_size
+        dx = (x2 - x1) // steps if steps else 0
+        dy = (y2 - y1) // steps if steps else 0
+        for k in range(steps):
+            segments.add((x1 + k * dx, y1 + k * dy, x1 + (k + 1) * dx, y1 + (k + 1) * dy))
+
+    for m in re.finditer(r'<line x1="(\d+)" y1="(\d+)" x2="(\d+)" y2="(\d+)"', svg):
+        add(*map(int, m.groups()))
+    for d in re.findall(r'<path d="([^"]*)"', svg):
+        for m in re.finditer(r'M(\d+) (\d+)([HV])(\d+)', d):
+            x, y, axis, end = int(m.group(1)), int(m.group(2)), m.group(3), int(m.group(4))
+            add(x, y, end, y) if axis == 'H' else add(x, y, x, end)
+    return segments
+
+
+def bench_svg(seeds: int = 20) -> bool:
+    """紧凑渲染与旧版渲染的几何一致性 + 体积对比"""
+    passed = True
+    for algorithm in ALGORITHMS:
+        for size in (2, 5, 10, 15, 22, 40):
+            for seed in range(seeds):
+                maze = MazeGenerator(size, seed)
+                maze.generate(algorithm)
+                if _unit_segments(maze.to_svg(), 25) != _unit_segments(maze.to_svg(compact=False), 25):
+                    print(f'geometry mismatch: {algorithm} size={size} seed={seed}')
+                    passed = False
+    print(f'geometry check: {"OK" if passed else "FAIL"}')
+
+    print(f'{"difficulty":<10} {"legacy B":>10} {"compact B":>10} {"base64 B":>10} {"saved":>7}')
+    for difficulty, config in DIFFICULTY_CONFIG.items():
+        legacy = compact = encoded = 0
+        for seed in range(seeds):
+            maze = MazeGenerator(config['size'], seed)
+            maze.generate(config['algorithm'])
+            legacy += len(maze.to_svg(compact=False))
+            svg = maze.to_svg()
+            compact += len(svg)
+            encoded += len(base64.b64encode(svg.encode('utf-8')))
+        print(f'{difficulty:<10} {legacy // seeds:>10} {compact // seeds:>10} {encoded // seeds:>10} '
+              f'{1 - compact / legacy:>7.0%}')
+    return passed
+
+
+def bench_algorithms(sizes=(22, 100, 300, 1000),
+                     algorithms=('dfs', 'kruskal', 'binary_tree', 'sidewinder', 'eller')):
+    """carve 只计生成算法本身，total 为完整 generate()（含入口/出口与 BFS 求解）"""
+    import numpy  # noqa: F401  预先导入，避免计入第一次向量化算法的耗时
+
+    print(f'{"size":>5} {"algorithm":<12} {"carve ms":>10} {"total ms":>10}')
+    for size in sizes:
+        for algorithm in algorithms:
+            maze = MazeGenerator(size, seed=1)
+            w = maze.width
+            for i in range(size):
+                row = (2 * i + 1) * w
+                maze.grid[row + 1:row + w - 1:2] = bytes(size)
+            t0 = time.perf_counter()
+            getattr(maze, f'_generate_{algorithm}')()
+            carve = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            MazeGenerator(size, seed=1).generate(algorithm)
+            total = time.perf_counter() - t0
+            print(f'{size:>5} {algorithm:<12} {carve * 1000:>10.1f} {total * 1000:>10.1f}')
+
+
+def bench_png(runs: int, dpi: int = 300, page: str = 'letter'):
+    """直接 PNG vs SVG -> PNG"""
+    try:
+        import cairosvg
+    except (ImportError, OSError):
+        cairosvg = None
+        print('cairosvg 不可用，跳过 SVG 栅格化对比')
+
+    from maze_generator import PAGE_SIZES
+    page_w, page_h = PAGE_SIZES[page]
+    print(f'{"difficulty":<10} {"direct ms":>10} {"PNG KiB":>9} {"svg+raster ms":>14}')
+    for difficulty, config in DIFFICULTY_CONFIG.items():
+        direct = []
+        rasterized = []
+        png_size = 0
+        for seed in range(runs):
+            maze = MazeGenerator(config['size'], seed)
+            maze.generate(config['algorithm'])
+
+            t0 = time.perf_counter()
+            png_size = len(maze.to_png(dpi, page))
+            direct.append(time.perf_counter() - t0)
+
+            if cairosvg is not None:
+                t0 = time.perf_counter()
+                cairosvg.svg2png(bytestring=maze.to_svg().encode('utf-8'),
+                                 output_width=round(min(page_w, page_h) * dpi),
+                                 background_color='white')
+                rasterized.append(time.perf_counter() - t0)
+        raster_ms = f'{statistics.mean(rasterized) * 1000:.1f}' if rasterized else '-'
+        print(f'{difficulty:<10} {statistics.mean(direct) * 1000:>10.1f} {png_size / 1024:>9.0f} '
+              f'{raster_ms:>14}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='迷宫生成器性能测试')
+    parser.add_argument('mode', choices=['serve', 'grid', 'scaling', 'svg', 'algorithms', 'png'], help='测试项目')
+    parser.add_argument('-n', '--runs', type=int, default=30, help='每项重复次数')
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        bench_serve(args.runs)
+    elif args.mode == 'grid':
+        bench_grid()
+    elif args.mode == 'scaling':
+        if not bench_scaling():
+            sys.exit(1)
+    elif args.mode == 'algorithms':
+        bench_algorithms()
+    elif args.mode == 'png':
+        bench_png(min(args.runs, 10))
+    elif args.mode == 'svg':
+        if not bench_svg():
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,37 +8,120 @@
 示例:
     python scripts/maze_generator.py -d easy -o maze.svg
     python scripts/maze_generator.py -d hard --solution -o maze_hard.svg
+    python scripts/maze_generator.py -d hard --seed 42 --cache-dir /tmp/maze-cache
+    python scripts/maze_generator.py -d easy --batch 24 --seed 100 --ordered > mazes.ndjson
+    python scripts/maze_generator.py --batch-spec pack.json --answer-key > mazes.ndjson
+    python scripts/maze_generator.py -d hard -f png --dpi 300 --page a4 -o maze.png
+    python scripts/maze_generator.py -d easy --sheet 4 --seed 7 --answer-key -o sheet.svg
+    python scripts/maze_generator.py -d medium --target solution_length=40:60 --target turns=25:
+
+常驻模式（供 Node.js 复用进程，按行读写 JSON）:
+    python scripts/maze_generator.py --serve
+    stdin:  {"id": 1, "difficulty": "hard", "seed": 42, "solution": false}
+    stdout: {"id": 1, "ok": true, "svg": "<svg ...>", "size": 22, "algorithm": "dfs", "seed": 42}
+    请求中加 "answer_key": true 时，响应同时包含同一迷宫的答案 "solution_svg"；
+    加 "target": {"solution_length": [40, 60]} 时按难度指标采样（"max_attempts" 限制尝试次数）；
+    加 "format": "png"（可选 "dpi"、"page"）时返回 base64 编码的 "png" / "solution_png"；
+    加 "sheet": 4（或迷宫参数列表）时把多个迷宫排在同一页 SVG 中返回
 """
 
+import io
+import os
+import sys
+import json
+import base64
 import random
 import argparse
-from typing import List
+from array import array
+from typing import List, Optional
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from result_cache import ResultCache
+
 
+# 渲染结果版本号：生成或绘制逻辑变化时递增，使旧缓存失效
+RENDER_VERSION = 2
+
+ALGORITHMS = ['dfs', 'kruskal', 'prim', 'bfs', 'binary_tree', 'sidewinder', 'eller']
+
+# 栅格输出的页面尺寸（英寸）
+PAGE_SIZES = {
+    'letter': (8.5, 11),
+    'a4': (8.27, 11.69),
+}
+
+# 难度指标（由 MazeGenerator._solve 计算）
+METRICS = ['solution_length', 'dead_ends', 'branch_points', 'turns']
 
 # 难度配置
 DIFFICULTY_CONFIG = {
     'easy': {'size': 10, 'algorithm': 'kruskal'},
     'medium': {'size': 15, 'algorithm': 'kruskal'},
     'hard': {'size': 22, 'algorithm': 'dfs'},
+    # 海报尺寸：使用逐行向量化的 Eller 算法快速生成
+    'poster': {'size': 60, 'algorithm': 'eller'},
 }
 
 
 class MazeGenerator:
-    """正方形迷宫生成器"""
+    """
+    正方形迷宫生成器
+
+    grid 为扁平 bytearray（1=墙，0=通路），(r, c) 对应下标 r * width + c，
+    width = 2 * size + 1；各算法的单元格簿记均以整数 cell id = i * size + j 索引。
+    """
     
-    def __init__(self, size: int = 12):
+    def __init__(self, size: int = 12, seed: Optional[int] = None):
         self.size = size
-        self.grid = [[1] * (2 * size + 1) for _ in range(2 * size + 1)]
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.width = 2 * size + 1
+        self.grid = bytearray(b'\x01') * (self.width * self.width)
         self.start = (1, 0)  # 入口位置
         self.end = (2 * size - 1, 2 * size)  # 出口位置
         self.solution_path = []
+        self.metrics = {}
+    
+    @property
+    def solution_length(self) -> int:
+        """解答路径经过的单元格数"""
+        return sum(1 for r, c in self.solution_path if r % 2 == 1 and c % 2 == 1)
     
-    def generate(self, algorithm: str = 'dfs') -> List[List[int]]:
+    def rows(self) -> List[List[int]]:
+        """以二维列表形式返回网格（调试/兼容用）"""
+        w = self.width
+        return [list(self.grid[r * w:(r + 1) * w]) for r in range(w)]
+    
+    def _carve(self, cell: int, neighbor: int):
+        """打通两个相邻单元格之间的墙"""
+        n, w = self.size, self.width
+        i1, j1 = divmod(cell, n)
+        i2, j2 = divmod(neighbor, n)
+        self.grid[(i1 + i2 + 1) * w + j1 + j2 + 1] = 0
+    
+    def _neighbors(self, cell: int, visited: bytearray) -> List[int]:
+        """未访问的相邻单元格，顺序为 右、下、左、上"""
+        n = self.size
+        i, j = divmod(cell, n)
+        neighbors = []
+        if j + 1 < n and not visited[cell + 1]:
+            neighbors.append(cell + 1)
+        if i + 1 < n and not visited[cell + n]:
+            neighbors.append(cell + n)
+        if j > 0 and not visited[cell - 1]:
+            neighbors.append(cell - 1)
+        if i > 0 and not visited[cell - n]:
+            neighbors.append(cell - n)
+        return neighbors
+    
+    def generate(self, algorithm: str = 'dfs') -> bytearray:
         """生成迷宫"""
+        w = self.width
         for i in range(self.size):
-            for j in range(self.size):
-                self.grid[2 * i + 1][2 * j + 1] = 0
+            row = (2 * i + 1) * w
+            self.grid[row + 1:row + w - 1:2] = bytes(self.size)
         
         if algorithm == 'dfs':
             self._generate_dfs()
@@ -48,22 +131,20 @@ class MazeGenerator:
             self._generate_prim()
         elif algorithm == 'bfs':
             self._generate_bfs()
+        elif algorithm == 'binary_tree':
+            self._generate_binary_tree()
+        elif algorithm == 'sidewinder':
+            self._generate_sidewinder()
+        elif algorithm == 'eller':
+            self._generate_eller()
         else:
             self._generate_dfs()
         
-        # 设置入口（加宽开口）
-        self.grid[self.start[0]][self.start[1]] = 0
-        if self.start[0] + 1 < len(self.grid):
-            self.grid[self.start[0] + 1][self.start[1]] = 0
-        if self.start[0] - 1 >= 0:
-            self.grid[self.start[0] - 1][self.start[1]] = 0
-        
-        # 设置出口（加宽开口）
-        self.grid[self.end[0]][self.end[1]] = 0
-        if self.end[0] + 1 < len(self.grid):
-            self.grid[self.end[0] + 1][self.end[1]] = 0
-        if self.end[0] - 1 >= 0:
-            self.grid[self.end[0] - 1][self.end[1]] = 0
+        # 设置入口、出口（加宽开口）
+        for r, c in (self.start, self.end):
+            for dr in (0, 1, -1):
+                if 0 <= r + dr < w:
+                    self.grid[(r + dr) * w + c] = 0
         
         self._solve()
         
@@ -71,156 +152,337 @@ class MazeGenerator:
     
     def _generate_dfs(self):
         """深度优先搜索生成迷宫"""
-        visited = [[False] * self.size for _ in range(self.size)]
-        stack = [(0, 0)]
-        visited[0][0] = True
-        
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        visited = bytearray(self.size * self.size)
+        stack = array('i', [0])
+        visited[0] = 1
         
         while stack:
-            x, y = stack[-1]
-            neighbors = []
-            
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.size and 0 <= ny < self.size and not visited[nx][ny]:
-                    neighbors.append((nx, ny, dx, dy))
+            cell = stack[-1]
+            neighbors = self._neighbors(cell, visited)
             
             if neighbors:
-                nx, ny, dx, dy = random.choice(neighbors)
-                self.grid[2 * x + 1 + dx][2 * y + 1 + dy] = 0
-                visited[nx][ny] = True
-                stack.append((nx, ny))
+                neighbor = self.rng.choice(neighbors)
+                self._carve(cell, neighbor)
+                visited[neighbor] = 1
+                stack.append(neighbor)
             else:
                 stack.pop()
     
     def _generate_kruskal(self):
         """Kruskal 算法生成迷宫"""
-        parent = {}
+        n = self.size
+        parent = array('i', range(n * n))
+        rank = bytearray(n * n)
         
         def find(x):
-            if parent[x] != x:
-                parent[x] = find(parent[x])
-            return parent[x]
+            # 迭代 + 路径减半，避免大网格上递归过深
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
         
         def union(x, y):
             px, py = find(x), find(y)
-            if px != py:
-                parent[px] = py
-                return True
-            return False
+            if px == py:
+                return False
+            if rank[px] > rank[py]:
+                px, py = py, px
+            parent[px] = py
+            if rank[px] == rank[py]:
+                rank[py] += 1
+            return True
         
-        for i in range(self.size):
-            for j in range(self.size):
-                parent[(i, j)] = (i, j)
+        # 墙编码为 cell * 2 + 方向（0=右，1=下）
+        walls = array('i')
+        for cell in range(n * n):
+            i, j = divmod(cell, n)
+            if j < n - 1:
+                walls.append(cell * 2)
+            if i < n - 1:
+                walls.append(cell * 2 + 1)
         
-        walls = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if j < self.size - 1:
-                    walls.append(((i, j), (i, j + 1)))
-                if i < self.size - 1:
-                    walls.append(((i, j), (i + 1, j)))
-        
-        random.shuffle(walls)
-        
-        for cell1, cell2 in walls:
-            if union(cell1, cell2):
-                x1, y1 = cell1
-                x2, y2 = cell2
-                wall_x = 2 * x1 + 1 + (x2 - x1)
-                wall_y = 2 * y1 + 1 + (y2 - y1)
-                self.grid[wall_x][wall_y] = 0
+        self.rng.shuffle(walls)
+        
+        for wall in walls:
+            cell, down = divmod(wall, 2)
+            neighbor = cell + n if down else cell + 1
+            if union(cell, neighbor):
+                self._carve(cell, neighbor)
     
     def _generate_prim(self):
         """Prim 算法生成迷宫"""
-        visited = [[False] * self.size for _ in range(self.size)]
-        walls = []
+        n = self.size
+        visited = bytearray(n * n)
         
-        start_x, start_y = random.randint(0, self.size - 1), random.randint(0, self.size - 1)
-        visited[start_x][start_y] = True
+        start_x, start_y = self.rng.randint(0, n - 1), self.rng.randint(0, n - 1)
+        start = start_x * n + start_y
+        visited[start] = 1
         
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-        
-        for dx, dy in directions:
-            nx, ny = start_x + dx, start_y + dy
-            if 0 <= nx < self.size and 0 <= ny < self.size:
-                walls.append((start_x, start_y, nx, ny))
+        # 墙记录为 (来源单元格, 目标单元格)
+        walls = [(start, neighbor) for neighbor in self._neighbors(start, bytearray(n * n))]
         
         while walls:
-            idx = random.randint(0, len(walls) - 1)
-            x1, y1, x2, y2 = walls.pop(idx)
+            # 随机取一面墙：与末尾交换后弹出，O(1)
+            idx = self.rng.randint(0, len(walls) - 1)
+            walls[idx], walls[-1] = walls[-1], walls[idx]
+            cell, neighbor = walls.pop()
             
-            if not visited[x2][y2]:
-                visited[x2][y2] = True
-                self.grid[x1 + x2 + 1][y1 + y2 + 1] = 0
+            if not visited[neighbor]:
+                visited[neighbor] = 1
+                self._carve(cell, neighbor)
                 
-                for dx, dy in directions:
-                    nx, ny = x2 + dx, y2 + dy
-                    if 0 <= nx < self.size and 0 <= ny < self.size and not visited[nx][ny]:
-                        walls.append((x2, y2, nx, ny))
+                for nxt in self._neighbors(neighbor, visited):
+                    walls.append((neighbor, nxt))
     
     def _generate_bfs(self):
         """广度优先搜索生成迷宫"""
-        visited = [[False] * self.size for _ in range(self.size)]
-        queue = deque([(0, 0)])
-        visited[0][0] = True
-        
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        visited = bytearray(self.size * self.size)
+        queue = deque([0])
+        visited[0] = 1
         
         while queue:
-            x, y = queue.popleft()
-            neighbors = []
+            cell = queue.popleft()
+            neighbors = self._neighbors(cell, visited)
+            
+            self.rng.shuffle(neighbors)
+            
+            for neighbor in neighbors:
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    self._carve(cell, neighbor)
+                    queue.append(neighbor)
+    
+    def _wall_arrays(self):
+        """
+        以 NumPy 视图返回 (东墙, 南墙)，写入视图即修改 self.grid
+        东墙 east[i, j] 位于单元格 (i, j) 与 (i, j + 1) 之间，形状 (n, n - 1)；
+        南墙 south[i, j] 位于单元格 (i, j) 与 (i + 1, j) 之间，形状 (n - 1, n)。
+        """
+        import numpy as np
+        
+        w = self.width
+        grid = np.frombuffer(self.grid, dtype=np.uint8).reshape(w, w)
+        return grid[1:w - 1:2, 2:w - 1:2], grid[2:w - 1:2, 1:w - 1:2]
+    
+    def _numpy_rng(self):
+        """由 self.rng 派生 NumPy 随机数生成器，保证同一种子结果可复现"""
+        import numpy as np
+        
+        return np.random.default_rng(self.rng.getrandbits(64))
+    
+    def _generate_binary_tree(self):
+        """二叉树算法（整张网格一次性向量化生成）：每个单元格随机打通北墙或东墙"""
+        n = self.size
+        east, south = self._wall_arrays()
+        rng = self._numpy_rng()
+        
+        north = rng.random((n, n)) < 0.5
+        north[0, :] = False          # 第一行只能向东
+        north[1:, n - 1] = True      # 最后一列只能向北
+        carve_east = ~north
+        carve_east[:, n - 1] = False
+        
+        # 单元格 (i, j) 的北墙即 south[i - 1, j]
+        south[north[1:]] = 0
+        east[carve_east[:, :n - 1]] = 0
+    
+    def _generate_sidewinder(self):
+        """Sidewinder 算法（整张网格向量化）：每行按随机长度分段，每段随机一个单元格向北打通"""
+        import numpy as np
+        
+        n = self.size
+        east, south = self._wall_arrays()
+        rng = self._numpy_rng()
+        
+        east[0, :] = 0  # 第一行整行打通
+        if n == 1:
+            return
+        
+        # 第 1..n-1 行：close 为 True 处结束当前分段，每行最后一格必定结束
+        close = rng.random((n - 1, n)) < 0.5
+        close[:, n - 1] = True
+        east[1:][~close[:, :n - 1]] = 0
+        
+        ends = np.flatnonzero(close.ravel())
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        picks = starts + (rng.random(len(ends)) * (ends - starts + 1)).astype(np.int64)
+        rows, cols = np.divmod(picks, n)
+        # 第 rows + 1 行单元格的北墙即 south[rows, cols]
+        south[rows, cols] = 0
+    
+    def _generate_eller(self):
+        """
+        Eller 算法（逐行处理）：随机数与向下打通按整行向量化，
+        行内合并用以集合编号为下标的小并查集
+        """
+        import numpy as np
+        
+        n = self.size
+        east, south = self._wall_arrays()
+        rng = self._numpy_rng()
+        
+        parent = []
+        
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
+        labels = np.arange(n)
+        for i in range(n):
+            last = i == n - 1
+            # 集合编号压缩为 0..k-1
+            _, labels = np.unique(labels, return_inverse=True)
+            parent[:] = range(int(labels.max()) + 1)
             
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.size and 0 <= ny < self.size and not visited[nx][ny]:
-                    neighbors.append((nx, ny, dx, dy))
+            # 行内合并：最后一行必须合并所有相邻的不同集合
+            merge = np.ones(n - 1, dtype=bool) if last else rng.random(n - 1) < 0.5
+            row_labels = labels.tolist()
+            for j in np.flatnonzero(merge).tolist():
+                a, b = find(row_labels[j]), find(row_labels[j + 1])
+                if a != b:
+                    parent[b] = a
+                    east[i, j] = 0
+            labels = np.array([find(x) for x in range(len(parent))])[labels]
+            if last:
+                break
             
-            random.shuffle(neighbors)
+            # 向下打通：每个集合至少一个单元格向下
+            down = rng.random(n) < 0.5
+            perm = rng.permutation(n)
+            _, first = np.unique(labels[perm], return_index=True)
+            down[perm[first]] = True
+            south[i, down] = 0
             
-            for nx, ny, dx, dy in neighbors:
-                if not visited[nx][ny]:
-                    visited[nx][ny] = True
-                    self.grid[2 * x + 1 + dx][2 * y + 1 + dy] = 0
-                    queue.append((nx, ny))
+            # 未向下打通的单元格在下一行成为新集合
+            labels = np.where(down, labels, n + np.arange(n))
     
     def _solve(self):
-        """使用 BFS 找到从入口到出口的最短路径"""
-        rows, cols = len(self.grid), len(self.grid[0])
-        start = (self.start[0], self.start[1])
-        end = (self.end[0], self.end[1])
+        """
+        使用 BFS 找到从入口到出口的最短路径，并在同一遍遍历中统计难度指标
         
-        visited = set()
-        parent = {}
-        queue = deque([start])
-        visited.add(start)
-        parent[start] = None
+        遍历所有连通的通路格（O(单元格数)），顺带统计每个单元格的通路数：
+        1 个为死胡同，3 个及以上为岔路口；拐弯数沿解答路径统计。
+        """
+        w = self.width
+        grid = self.grid
+        start = self.start[0] * w + self.start[1]
+        end = self.end[0] * w + self.end[1]
         
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+        # parent 兼作 visited：-1 表示未访问
+        parent = array('i', [-1]) * (w * w)
+        queue = deque([start])
+        parent[start] = start
+        dead_ends = 0
+        branch_points = 0
         
         while queue:
-            r, c = queue.popleft()
-            
-            if (r, c) == end:
-                path = []
-                current = end
-                while current is not None:
-                    path.append(current)
-                    current = parent[current]
-                self.solution_path = path[::-1]
-                return
-            
-            for dr, dc in directions:
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < rows and 0 <= nc < cols:
-                    if (nr, nc) not in visited and self.grid[nr][nc] == 0:
-                        visited.add((nr, nc))
-                        parent[(nr, nc)] = (r, c)
-                        queue.append((nr, nc))
-    
-    def to_svg(self, cell_size: int = 25, wall_width: int = 3, show_solution: bool = False) -> str:
-        """导出为 SVG 格式"""
+            pos = queue.popleft()
+            r, c = divmod(pos, w)
+            degree = 0
+            # 顺序：右、左、下、上
+            for nxt, ok in ((pos + 1, c + 1 < w), (pos - 1, c > 0),
+                            (pos + w, pos + w < w * w), (pos - w, pos >= w)):
+                if ok and grid[nxt] == 0:
+                    degree += 1
+                    if parent[nxt] < 0:
+                        parent[nxt] = pos
+                        queue.append(nxt)
+            if r % 2 == 1 and c % 2 == 1:
+                if degree == 1:
+                    dead_ends += 1
+                elif degree >= 3:
+                    branch_points += 1
+        
+        self.solution_path = []
+        if parent[end] >= 0:
+            pos = end
+            path = [end]
+            while pos != start:
+                pos = parent[pos]
+                path.append(pos)
+            self.solution_path = [divmod(p, w) for p in reversed(path)]
+        
+        path = self.solution_path
+        turns = sum(1 for k in range(1, len(path) - 1)
+                    if (path[k][0] - path[k - 1][0], path[k][1] - path[k - 1][1])
+                    != (path[k + 1][0] - path[k][0], path[k + 1][1] - path[k][1]))
+        self.metrics = {
+            'solution_length': self.solution_length,
+            'dead_ends': dead_ends,
+            'branch_points': branch_points,
+            'turns': turns,
+        }
+    
+    def _wall_runs(self):
+        """
+        把相邻的共线墙壁合并成长线段（网格坐标，以单元格为单位）
+        返回 (水平线段 [(y, x1, x2)], 竖直线段 [(x, y1, y2)])
+        """
+        n, w, grid = self.size, self.width, self.grid
+        horizontal = []
+        for y in range(n + 1):
+            row = 2 * y * w
+            start = None
+            for x in range(n + 1):
+                if x < n and grid[row + 2 * x + 1]:
+                    if start is None:
+                        start = x
+                elif start is not None:
+                    horizontal.append((y, start, x))
+                    start = None
+        vertical = []
+        for x in range(n + 1):
+            start = None
+            for y in range(n + 1):
+                if y < n and grid[(2 * y + 1) * w + 2 * x]:
+                    if start is None:
+                        start = y
+                elif start is not None:
+                    vertical.append((x, start, y))
+                    start = None
+        return horizontal, vertical
+    
+    def _wall_path(self, cell_size: int, offset_x: int = 0, offset_y: int = 0) -> str:
+        """合并后的墙壁线段，作为 <path> 的 d 属性"""
+        horizontal, vertical = self._wall_runs()
+        d = []
+        for y, x1, x2 in horizontal:
+            d.append(f'M{x1 * cell_size + offset_x} {y * cell_size + offset_y}'
+                     f'H{x2 * cell_size + offset_x}')
+        for x, y1, y2 in vertical:
+            d.append(f'M{x * cell_size + offset_x} {y1 * cell_size + offset_y}'
+                     f'V{y2 * cell_size + offset_y}')
+        return ''.join(d)
+    
+    def _solution_points(self, cell_size: int, offset_x: int = 0, offset_y: int = 0,
+                         compact: bool = True) -> str:
+        """解答路径的 points 属性；compact 时只保留拐点并取整"""
+        points = self.solution_path
+        if compact:
+            # 只保留拐点（去掉共线的中间点）
+            points = [p for k, p in enumerate(points)
+                      if k == 0 or k == len(points) - 1
+                      or (points[k - 1][0] - p[0], points[k - 1][1] - p[1])
+                      != (p[0] - points[k + 1][0], p[1] - points[k + 1][1])]
+        path_points = []
+        for r, c in points:
+            x = (c // 2 + 0.5) * cell_size if c % 2 == 1 else (c // 2) * cell_size
+            y = (r // 2 + 0.5) * cell_size if r % 2 == 1 else (r // 2) * cell_size
+            if compact:
+                path_points.append(f'{int(x + offset_x + 0.5)},{int(y + offset_y + 0.5)}')
+            else:
+                path_points.append(f'{x + offset_x},{y + offset_y}')
+        return ' '.join(path_points)
+    
+    def _svg_elements(self, cell_size: int, wall_width: int, compact: bool = True):
+        """
+        返回 (SVG 头, 解答路径元素列表, 墙壁元素列表)
+        
+        compact=True 时墙壁合并为一个 <path>（描边样式写在外层 <g> 上），坐标取整；
+        compact=False 为旧版输出，每段墙一个 <line>。
+        """
         # 迷宫实际尺寸
         maze_width = self.size * cell_size
         maze_height = self.size * cell_size
@@ -234,88 +496,606 @@ class MazeGenerator:
         offset_x = padding
         offset_y = padding
         
-        lines = []
-        lines.append(f'<svg xmlns="http://www.w3.org/2000/svg" '
-                    f'width="{svg_width}" height="{svg_height}" '
-                    f'viewBox="0 0 {svg_width} {svg_height}">')
+        header = (f'<svg xmlns="http://www.w3.org/2000/svg" '
+                  f'width="{svg_width}" height="{svg_height}" '
+                  f'viewBox="0 0 {svg_width} {svg_height}">')
         # 不添加白色背景，保持透明
         
-        # 绘制解答路径
-        if show_solution and self.solution_path:
-            path_points = []
-            for r, c in self.solution_path:
-                x = (c // 2 + 0.5) * cell_size if c % 2 == 1 else (c // 2) * cell_size
-                y = (r // 2 + 0.5) * cell_size if r % 2 == 1 else (r // 2) * cell_size
-                path_points.append(f'{x + offset_x},{y + offset_y}')
-            
-            lines.append(f'<polyline points="{" ".join(path_points)}" '
-                        f'stroke="#FF6B6B" stroke-width="4" fill="none" '
-                        f'stroke-linecap="round" stroke-linejoin="round" opacity="0.7"/>')
-        
-        # 绘制墙壁
-        for i in range(len(self.grid)):
-            for j in range(len(self.grid[0])):
-                if self.grid[i][j] == 1:
+        # 解答路径
+        solution = []
+        if self.solution_path:
+            solution.append(f'<polyline points="{self._solution_points(cell_size, offset_x, offset_y, compact)}" '
+                            f'stroke="#FF6B6B" stroke-width="4" fill="none" '
+                            f'stroke-linecap="round" stroke-linejoin="round" opacity="0.7"/>')
+        
+        # 墙壁
+        walls = []
+        if compact:
+            walls.append(f'<g fill="none" stroke="black" stroke-width="{wall_width}" '
+                         f'stroke-linecap="round"><path d="{self._wall_path(cell_size, offset_x, offset_y)}"/></g>')
+            return header, solution, walls
+        
+        w = self.width
+        for i in range(w):
+            for j in range(w):
+                if self.grid[i * w + j] == 1:
                     if i % 2 == 0 and j % 2 == 1:
                         x1 = (j // 2) * cell_size + offset_x
                         y1 = (i // 2) * cell_size + offset_y
                         x2 = x1 + cell_size
                         y2 = y1
-                        lines.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
-                                   f'stroke="black" stroke-width="{wall_width}" stroke-linecap="round"/>')
+                        walls.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
+                                     f'stroke="black" stroke-width="{wall_width}" stroke-linecap="round"/>')
                     elif i % 2 == 1 and j % 2 == 0:
                         x1 = (j // 2) * cell_size + offset_x
                         y1 = (i // 2) * cell_size + offset_y
                         x2 = x1
                         y2 = y1 + cell_size
-                        lines.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
-                                   f'stroke="black" stroke-width="{wall_width}" stroke-linecap="round"/>')
+                        walls.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
+                                     f'stroke="black" stroke-width="{wall_width}" stroke-linecap="round"/>')
         
-
+        return header, solution, walls
+    
+    def to_svg(self, cell_size: int = 25, wall_width: int = 3, show_solution: bool = False,
+               compact: bool = True) -> str:
+        """导出为 SVG 格式"""
+        header, solution, walls = self._svg_elements(cell_size, wall_width, compact)
+        body = solution + walls if show_solution else walls
+        return '\n'.join([header] + body + ['</svg>'])
+    
+    def to_svg_pair(self, cell_size: int = 25, wall_width: int = 3, compact: bool = True):
+        """一次生成的迷宫同时导出 (题目 SVG, 答案 SVG)，墙壁只绘制一次"""
+        header, solution, walls = self._svg_elements(cell_size, wall_width, compact)
+        puzzle = '\n'.join([header] + walls + ['</svg>'])
+        answer = '\n'.join([header] + solution + walls + ['</svg>'])
+        return puzzle, answer
+    
+    def _raster_walls(self, dpi: int, page, cell_size: int, wall_width: int):
+        """
+        按打印尺寸直接绘制墙壁，返回 (灰度图, 网格坐标 -> 像素坐标的函数, 每格像素数)
+        版式与 SVG 相同（四周各留 2 格边距），整体等比缩放后居中放入页面。
+        """
+        from PIL import Image, ImageDraw
+        
+        page_w, page_h = PAGE_SIZES[page] if isinstance(page, str) else page
+        width_px, height_px = round(page_w * dpi), round(page_h * dpi)
+        box = self.size + 4
+        unit = min(width_px, height_px) / box
+        origin_x = (width_px - box * unit) / 2 + 2 * unit
+        origin_y = (height_px - box * unit) / 2 + 2 * unit
         
-        lines.append('</svg>')
-        return '\n'.join(lines)
+        def to_px(x, y):
+            return round(origin_x + x * unit), round(origin_y + y * unit)
+        
+        image = Image.new('L', (width_px, height_px), 255)
+        draw = ImageDraw.Draw(image)
+        line_width = max(1, round(wall_width / cell_size * unit))
+        radius = line_width / 2
+        horizontal, vertical = self._wall_runs()
+        segments = ([(to_px(x1, y), to_px(x2, y)) for y, x1, x2 in horizontal]
+                    + [(to_px(x, y1), to_px(x, y2)) for x, y1, y2 in vertical])
+        for start, end in segments:
+            draw.line([start, end], fill=0, width=line_width)
+            # 圆头线帽
+            if line_width > 2:
+                for px, py in (start, end):
+                    draw.ellipse([px - radius, py - radius, px + radius, py + radius], fill=0)
+        return image, to_px, unit
+    
+    def _raster_solution(self, size_px, to_px, unit: float, cell_size: int):
+        """在白底 RGB 图上绘制解答路径（颜色按 SVG 中 0.7 不透明度与白底混合）"""
+        from PIL import Image, ImageDraw
+        
+        image = Image.new('RGB', size_px, (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        points = [to_px(c / 2, r / 2) for r, c in self.solution_path]
+        if len(points) > 1:
+            line_width = max(1, round(4 / cell_size * unit))
+            draw.line(points, fill=(255, 151, 151), width=line_width, joint='curve')
+        return image
+    
+    def to_png(self, dpi: int = 300, page='letter', cell_size: int = 25, wall_width: int = 3,
+               show_solution: bool = False) -> bytes:
+        """
+        直接从网格栅格化为 PNG（不经过 SVG），适合打印
+        page 为 PAGE_SIZES 中的名称或 (宽, 高) 英寸
+        """
+        from PIL import ImageChops
+        
+        walls, to_px, unit = self._raster_walls(dpi, page, cell_size, wall_width)
+        if not show_solution:
+            # 题目只有纯黑白两色，存为 1 位 PNG
+            return _png_bytes(walls.convert('1'), dpi)
+        answer = ImageChops.multiply(self._raster_solution(walls.size, to_px, unit, cell_size),
+                                     walls.convert('RGB'))
+        return _png_bytes(answer, dpi)
+    
+    def to_png_pair(self, dpi: int = 300, page='letter', cell_size: int = 25,
+                    wall_width: int = 3):
+        """同一迷宫同时栅格化为 (题目 PNG, 答案 PNG)，墙壁只绘制一次"""
+        from PIL import ImageChops
+        
+        walls, to_px, unit = self._raster_walls(dpi, page, cell_size, wall_width)
+        # 答案图：先画解答路径，再用正片叠底把墙壁盖在上面（与 SVG 的绘制顺序一致）
+        answer = ImageChops.multiply(self._raster_solution(walls.size, to_px, unit, cell_size),
+                                     walls.convert('RGB'))
+        return _png_bytes(walls.convert('1'), dpi), _png_bytes(answer, dpi)
+
+
+def _png_bytes(image, dpi: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+def render_maze(size: int, algorithm: str, seed: int, cell_size: int = 25,
+                wall_width: int = 3, show_solution: bool = False, answer_key: bool = False,
+                cache: Optional[ResultCache] = None, fmt: str = 'svg', dpi: int = 300,
+                page: str = 'letter'):
+    """
+    生成并渲染迷宫，返回 ({'svg': ..., ['solution_svg': ...], 'metrics': {...}}, 是否命中缓存)
+    
+    answer_key=True 时只生成一次迷宫，同时返回题目（svg）和答案（solution_svg）。
+    fmt='png' 时直接栅格化，字段为 png / solution_png（bytes）。
+    同一组 (size, algorithm, seed, cell_size, wall_width, show_solution) 总是得到同一个 SVG，
+    因此可以直接从缓存返回；难度指标只取决于 (size, algorithm, seed)，与渲染结果一起缓存。
+    """
+    # 结果字段 -> 是否显示解答路径
+    variants = {fmt: False, f'solution_{fmt}': True} if answer_key else {fmt: show_solution}
+    
+    keys = {}
+    if cache is not None:
+        raster = ('png', dpi, page) if fmt == 'png' else ()
+        keys = {name: ResultCache.make_key('maze', RENDER_VERSION, size, algorithm, seed,
+                                           cell_size, wall_width, solution, *raster)
+                for name, solution in variants.items()}
+        keys['metrics'] = ResultCache.make_key('maze_metrics', RENDER_VERSION, size, algorithm, seed)
+        cached = {name: cache.get(key) for name, key in keys.items()}
+        if all(data is not None for data in cached.values()):
+            metrics = json.loads(cached.pop('metrics'))
+            if fmt == 'svg':
+                cached = {name: data.decode('utf-8') for name, data in cached.items()}
+            return {**cached, 'metrics': metrics}, True
+    
+    maze = MazeGenerator(size, seed)
+    maze.generate(algorithm)
+    result = {**_render(maze, cell_size, wall_width, show_solution, answer_key, fmt, dpi, page),
+              'metrics': maze.metrics}
+    
+    for name, key in keys.items():
+        data = json.dumps(result[name]) if name == 'metrics' else result[name]
+        cache.put(key, data.encode('utf-8') if isinstance(data, str) else data)
+    return result, False
+
+
+def _render(maze: MazeGenerator, cell_size: int, wall_width: int, show_solution: bool,
+            answer_key: bool, fmt: str = 'svg', dpi: int = 300, page: str = 'letter') -> dict:
+    """把已生成的迷宫渲染为 {'svg': ..., ['solution_svg': ...]} 或 {'png': ..., ['solution_png': ...]}"""
+    if fmt == 'png':
+        if answer_key:
+            puzzle, answer = maze.to_png_pair(dpi, page, cell_size, wall_width)
+            return {'png': puzzle, 'solution_png': answer}
+        return {'png': maze.to_png(dpi, page, cell_size, wall_width, show_solution)}
+    if answer_key:
+        puzzle, answer = maze.to_svg_pair(cell_size, wall_width)
+        return {'svg': puzzle, 'solution_svg': answer}
+    return {'svg': maze.to_svg(cell_size, wall_width, show_solution=show_solution)}
+
+
+def render_sheet(mazes: List[MazeGenerator], cell_size: int = 25, wall_width: int = 3,
+                 answer_key: bool = False) -> dict:
+    """
+    把多个迷宫排版到同一页 SVG（2 个上下排列，更多时两列），返回 {'svg': ..., ['solution_svg': ...]}
+    
+    描边样式只在 <defs> 里以 CSS 类定义一次，每个迷宫放在各自平移的 <g> 中；
+    answer_key=True 时同一组迷宫再输出一页答案。
+    """
+    if not mazes:
+        raise ValueError('sheet needs at least one maze')
+    cols = 1 if len(mazes) <= 2 else 2
+    rows = (len(mazes) + cols - 1) // cols
+    slot = max(maze.size for maze in mazes) * cell_size
+    gap = cell_size * 2
+    width = cols * slot + (cols + 1) * gap
+    height = rows * slot + (rows + 1) * gap
+    
+    header = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+              f'viewBox="0 0 {width} {height}">')
+    style = (f'<defs><style>.w{{fill:none;stroke:#000;stroke-width:{wall_width};stroke-linecap:round}}'
+             '.s{fill:none;stroke:#FF6B6B;stroke-width:4;stroke-linecap:round;'
+             'stroke-linejoin:round;opacity:.7}</style></defs>')
+    
+    puzzle, answer = [header, style], [header, style]
+    for k, maze in enumerate(mazes):
+        row, col = divmod(k, cols)
+        # 小迷宫在格位内居中
+        inset = (slot - maze.size * cell_size) // 2
+        x = gap + col * (slot + gap) + inset
+        y = gap + row * (slot + gap) + inset
+        walls = f'<path class="w" d="{maze._wall_path(cell_size)}"/>'
+        puzzle.append(f'<g transform="translate({x},{y})">{walls}</g>')
+        if answer_key:
+            answer.append(f'<g transform="translate({x},{y})">'
+                          f'<polyline class="s" points="{maze._solution_points(cell_size)}"/>{walls}</g>')
+    
+    result = {'svg': '\n'.join(puzzle + ['</svg>'])}
+    if answer_key:
+        result['solution_svg'] = '\n'.join(answer + ['</svg>'])
+    return result
+
+
+def _jsonable(result: dict) -> dict:
+    """PNG 等二进制字段转为 base64 字符串，便于逐行输出 JSON"""
+    return {name: base64.b64encode(value).decode('ascii') if isinstance(value, bytes) else value
+            for name, value in result.items()}
+
+
+def _target_distance(metrics: dict, targets: dict) -> float:
+    """指标偏离目标区间的相对距离，0 表示全部落在区间内"""
+    distance = 0.0
+    for name, (low, high) in targets.items():
+        value = metrics[name]
+        if low is not None and value < low:
+            distance += (low - value) / max(abs(low), 1)
+        elif high is not None and value > high:
+            distance += (value - high) / max(abs(high), 1)
+    return distance
+
+
+def generate_targeted(size: int, algorithm: str, seed: int, targets: dict,
+                      max_attempts: int = 50):
+    """
+    拒绝采样：不断生成候选迷宫，直到各项指标落入目标区间
+    
+    targets 形如 {'solution_length': (60, 90), 'dead_ends': (None, 40)}，None 表示不限。
+    候选种子由 seed 派生，返回的迷宫可直接用 maze.seed 复现。
+    超出尝试次数时返回最接近目标的候选。返回 (maze, 尝试次数, 是否达标)
+    """
+    for name in targets:
+        if name not in METRICS:
+            raise ValueError(f'unknown metric: {name}')
+    master = random.Random(seed)
+    best, best_distance = None, None
+    for attempt in range(1, max(1, max_attempts) + 1):
+        maze = MazeGenerator(size, master.getrandbits(32))
+        maze.generate(algorithm)
+        distance = _target_distance(maze.metrics, targets)
+        if distance == 0:
+            return maze, attempt, True
+        if best is None or distance < best_distance:
+            best, best_distance = maze, distance
+    return best, max(1, max_attempts), False
+
+
+def open_cache(directory: Optional[str], max_mb: float) -> Optional[ResultCache]:
+    """按配置打开渲染结果缓存（SVG/PNG），未配置目录时不启用"""
+    if not directory:
+        return None
+    return ResultCache(directory, int(max_mb * 1024 * 1024))
+
+
+def _resolve_request(request: dict):
+    """解析请求参数，返回 (size, algorithm, seed, cell_size, wall_width)；seed 可能为 None"""
+    difficulty = request.get('difficulty') or 'medium'
+    if difficulty not in DIFFICULTY_CONFIG:
+        raise ValueError(f'unknown difficulty: {difficulty}')
+    config = DIFFICULTY_CONFIG[difficulty]
+    algorithm = request.get('algorithm') or config['algorithm']
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'unknown algorithm: {algorithm}')
+    size = int(request.get('size') or config['size'])
+    if size < 2:
+        raise ValueError(f'invalid size: {size}')
+    seed = request.get('seed')
+    seed = None if seed is None else int(seed)
+    cell_size = int(request.get('cell_size') or 25)
+    wall_width = int(request.get('wall_width') or 3)
+    return size, algorithm, seed, cell_size, wall_width
+
+
+def _output_options(request: dict):
+    """解析输出格式参数，返回 (fmt, dpi, page)"""
+    fmt = request.get('format') or 'svg'
+    if fmt not in ('svg', 'png'):
+        raise ValueError(f'unknown format: {fmt}')
+    page = request.get('page') or 'letter'
+    if page not in PAGE_SIZES:
+        raise ValueError(f'unknown page size: {page}')
+    dpi = int(request.get('dpi') or 300)
+    if not 36 <= dpi <= 1200:
+        raise ValueError(f'invalid dpi: {dpi}')
+    return fmt, dpi, page
+
+
+def _parse_targets(targets: Optional[dict]) -> dict:
+    """{'solution_length': [60, 90]} -> {'solution_length': (60, 90)}，边界可为 null"""
+    parsed = {}
+    for name, band in (targets or {}).items():
+        low, high = band
+        parsed[name] = (None if low is None else float(low), None if high is None else float(high))
+    return parsed
+
+
+def handle_sheet(request: dict) -> dict:
+    """
+    整页多迷宫请求：sheet 为迷宫数量，或每项字段同普通请求的列表（未给出的字段沿用外层请求）
+    """
+    sheet = request['sheet']
+    base = {key: value for key, value in request.items() if key not in ('sheet', 'id')}
+    if isinstance(sheet, int):
+        seed = request.get('seed')
+        items = [{**base, 'seed': None if seed is None else int(seed) + k} for k in range(sheet)]
+    else:
+        items = [{**base, **item} for item in sheet]
+    if not 1 <= len(items) <= 12:
+        raise ValueError(f'invalid sheet size: {len(items)}')
+    # 与命令行 --sheet 一致：整页排版只输出 SVG
+    if any(_output_options(item)[0] != 'svg' for item in items):
+        raise ValueError('sheet only supports SVG output')
+    
+    mazes = []
+    for item in items:
+        size, algorithm, seed, _, _ = _resolve_request(item)
+        maze = MazeGenerator(size, random.getrandbits(32) if seed is None else seed)
+        maze.generate(algorithm)
+        mazes.append(maze)
+    
+    _, _, _, cell_size, wall_width = _resolve_request(base)
+    result = render_sheet(mazes, cell_size, wall_width, bool(request.get('answer_key')))
+    return {'ok': True, **result,
+            'mazes': [{'seed': maze.seed, 'size': maze.size, 'metrics': maze.metrics}
+                      for maze in mazes]}
+
+
+def handle_request(request: dict, cache: Optional[ResultCache] = None) -> dict:
+    """处理一条 JSON 请求，返回可直接序列化的响应"""
+    if request.get('sheet'):
+        return handle_sheet(request)
+    size, algorithm, seed, cell_size, wall_width = _resolve_request(request)
+    fmt, dpi, page = _output_options(request)
+    if seed is None:
+        # 未指定种子时随机生成一个并返回，便于之后复现同一个迷宫；随机迷宫不写缓存
+        seed = random.getrandbits(32)
+        cache = None
+    
+    targets = _parse_targets(request.get('target'))
+    if targets:
+        # 按难度指标拒绝采样；返回的 seed 为选中迷宫自身的种子
+        maze, attempts, met = generate_targeted(size, algorithm, seed, targets,
+                                                int(request.get('max_attempts') or 50))
+        result = _render(maze, cell_size, wall_width, bool(request.get('solution')),
+                         bool(request.get('answer_key')), fmt, dpi, page)
+        return {'ok': True, **_jsonable(result), 'size': size, 'algorithm': algorithm, 'seed': maze.seed,
+                'cached': False, 'metrics': maze.metrics, 'attempts': attempts, 'target_met': met}
+    
+    result, cached = render_maze(size, algorithm, seed, cell_size, wall_width,
+                                 bool(request.get('solution')), bool(request.get('answer_key')),
+                                 cache, fmt, dpi, page)
+    return {'ok': True, **_jsonable(result), 'size': size, 'algorithm': algorithm,
+            'seed': seed, 'cached': cached}
+
+
+def _batch_job(index: int, request: dict) -> dict:
+    """批量模式中的单个任务（在子进程中执行）"""
+    try:
+        size, algorithm, seed, cell_size, wall_width = _resolve_request(request)
+        fmt, dpi, page = _output_options(request)
+        targets = _parse_targets(request.get('target'))
+        if targets:
+            maze, _, _ = generate_targeted(size, algorithm, seed, targets,
+                                           int(request.get('max_attempts') or 50))
+        else:
+            maze = MazeGenerator(size, seed)
+            maze.generate(algorithm)
+        record = {'index': index, 'ok': True, 'seed': maze.seed, 'size': size,
+                  'algorithm': algorithm, 'solution_length': maze.solution_length,
+                  'metrics': maze.metrics}
+        record.update(_jsonable(_render(maze, cell_size, wall_width, bool(request.get('solution')),
+                                        bool(request.get('answer_key')), fmt, dpi, page)))
+        return record
+    except Exception as e:
+        return {'index': index, 'ok': False, 'error': str(e)}
+
+
+def run_batch(requests: List[dict], workers: Optional[int] = None, ordered: bool = False,
+              stdout=None):
+    """
+    多进程批量生成，每完成一个迷宫输出一行 NDJSON
+    
+    ordered=True 时按请求顺序输出（结果可复现）；否则谁先完成先输出。
+    """
+    stdout = stdout or sys.stdout
+    if workers is None:
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    workers = max(1, min(workers or 1, len(requests) or 1))
+    # 未指定种子的任务在主进程中分配种子，保证每条记录都能复现
+    requests = [request if request.get('seed') is not None
+                else {**request, 'seed': random.getrandbits(32)} for request in requests]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_batch_job, i, request) for i, request in enumerate(requests)]
+        for future in (futures if ordered else as_completed(futures)):
+            stdout.write(json.dumps(future.result()) + '\n')
+            stdout.flush()
+
+
+def serve(stdin=None, stdout=None, cache: Optional[ResultCache] = None):
+    """常驻模式：每行一个 JSON 请求，每行输出一个 JSON 响应（顺序与请求一致）"""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            request_id = request.get('id')
+            response = handle_request(request, cache)
+        except Exception as e:
+            # 单个请求出错不影响进程继续服务
+            response = {'ok': False, 'error': str(e)}
+        stdout.write(json.dumps({'id': request_id, **response}) + '\n')
+        stdout.flush()
 
 
 def main():
     parser = argparse.ArgumentParser(description='正方形迷宫生成器')
     parser.add_argument('-d', '--difficulty', default='medium',
-                       choices=['easy', 'medium', 'hard'],
-                       help='难度: easy(12x12), medium(15x15), hard(22x22)')
+                       choices=list(DIFFICULTY_CONFIG),
+                       help='难度: easy(10x10), medium(15x15), hard(22x22), poster(60x60)')
     parser.add_argument('-a', '--algorithm', default=None,
-                       choices=['dfs', 'kruskal', 'prim', 'bfs'],
+                       choices=ALGORITHMS,
                        help='生成算法（默认根据难度自动选择）')
     parser.add_argument('-s', '--size', type=int, default=None, help='迷宫大小（覆盖难度设置）')
     parser.add_argument('-o', '--output', default=None, help='输出文件（不指定则输出到 stdout）')
     parser.add_argument('--solution', action='store_true', help='显示解答路径')
+    parser.add_argument('--answer-key', action='store_true',
+                       help='同一个迷宫同时输出题目和答案（文件输出为 xxx.svg 与 xxx_solution.svg，'
+                            'stdout 输出为 JSON）')
     parser.add_argument('-c', '--cell-size', type=int, default=25, help='单元格大小')
+    parser.add_argument('-f', '--format', default='svg', choices=['svg', 'png'],
+                       help='输出格式：svg，或按打印尺寸直接栅格化的 png')
+    parser.add_argument('--dpi', type=int, default=300, help='PNG 输出分辨率')
+    parser.add_argument('--page', default='letter', choices=list(PAGE_SIZES), help='PNG 页面尺寸')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子（相同种子生成相同迷宫）')
     parser.add_argument('--stdout', action='store_true', help='输出到 stdout（用于 Node.js 调用）')
+    parser.add_argument('--target', action='append', default=[], metavar='METRIC=MIN:MAX',
+                       help=f'难度指标目标区间，可重复；指标: {", ".join(METRICS)}；'
+                            '边界可省略，如 solution_length=60: 或 dead_ends=:40')
+    parser.add_argument('--max-attempts', type=int, default=50, help='按目标区间采样的最大尝试次数')
+    parser.add_argument('--sheet', type=int, default=None, metavar='K',
+                       help='把 K 个迷宫排到同一页 SVG（共享样式定义；配合 --answer-key 输出答案页）')
+    parser.add_argument('--batch', type=int, default=None, metavar='N',
+                       help='批量生成 N 个迷宫，逐行输出 NDJSON（指定 --seed 时种子依次为 seed, seed+1, ...）')
+    parser.add_argument('--batch-spec', default=None, metavar='FILE',
+                       help='按 JSON 列表批量生成（每项字段同 --serve 请求，- 表示 stdin）')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='批量模式进程数（默认可用 CPU 核数）')
+    parser.add_argument('--ordered', action='store_true', help='批量模式按请求顺序输出')
+    parser.add_argument('--cache-dir', default=os.environ.get('MAZE_CACHE_DIR'),
+                       help='SVG 缓存目录（仅缓存指定了种子的迷宫，默认读取 MAZE_CACHE_DIR）')
+    parser.add_argument('--cache-max-mb', type=float,
+                       default=float(os.environ.get('MAZE_CACHE_MAX_MB') or 64),
+                       help='缓存容量上限（MB），超出后淘汰最久未使用的条目')
+    parser.add_argument('--serve', action='store_true',
+                       help='常驻模式：从 stdin 逐行读取 JSON 请求，逐行输出 JSON 响应')
     
     args = parser.parse_args()
     
+    cache = open_cache(args.cache_dir, args.cache_max_mb)
+    targets = {}
+    for item in args.target:
+        name, sep, band = item.partition('=')
+        low, colon, high = band.partition(':')
+        if name not in METRICS or not sep or not colon:
+            parser.error(f'invalid --target: {item}')
+        try:
+            targets[name] = [float(low) if low else None, float(high) if high else None]
+        except ValueError:
+            parser.error(f'invalid --target: {item}')
+    
+    if args.serve:
+        serve(cache=cache)
+        return
+    
+    if args.sheet:
+        if args.format != 'svg':
+            parser.error('--sheet only supports SVG output')
+        try:
+            result = handle_sheet({'sheet': args.sheet, 'difficulty': args.difficulty,
+                                   'algorithm': args.algorithm, 'size': args.size,
+                                   'seed': args.seed, 'cell_size': args.cell_size,
+                                   'answer_key': args.answer_key})
+        except ValueError as e:
+            parser.error(str(e))
+        if args.stdout or args.output is None:
+            print(json.dumps(result) if args.answer_key else result['svg'])
+        else:
+            base, ext = os.path.splitext(args.output)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(result['svg'])
+            if args.answer_key:
+                with open(f'{base}_solution{ext or ".svg"}', 'w', encoding='utf-8') as f:
+                    f.write(result['solution_svg'])
+            seeds = ', '.join(str(maze['seed']) for maze in result['mazes'])
+            print(f"[Maze] Generated sheet: {args.output} ({args.sheet} mazes, seeds: {seeds})",
+                  file=sys.stderr)
+        return
+    
+    if args.batch is not None or args.batch_spec:
+        defaults = {'difficulty': args.difficulty, 'algorithm': args.algorithm, 'size': args.size,
+                    'cell_size': args.cell_size, 'solution': args.solution,
+                    'answer_key': args.answer_key, 'target': targets, 'format': args.format,
+                    'dpi': args.dpi, 'page': args.page,
+                    'max_attempts': args.max_attempts}
+        if args.batch_spec:
+            if args.batch_spec == '-':
+                spec = json.load(sys.stdin)
+            else:
+                with open(args.batch_spec, encoding='utf-8') as f:
+                    spec = json.load(f)
+            requests = [{**defaults, **item} for item in spec]
+        else:
+            requests = [{**defaults, 'seed': None if args.seed is None else args.seed + k}
+                        for k in range(args.batch)]
+        run_batch(requests, args.jobs, args.ordered)
+        return
+    
     config = DIFFICULTY_CONFIG[args.difficulty]
     algorithm = args.algorithm or config['algorithm']
     size = args.size or config['size']
+    seed = args.seed
+    if seed is None:
+        seed = random.getrandbits(32)
+        cache = None
     
-    maze = MazeGenerator(size)
-    maze.generate(algorithm)
-    
-    svg = maze.to_svg(args.cell_size, show_solution=args.solution)
+    if targets:
+        maze, attempts, met = generate_targeted(size, algorithm, seed, _parse_targets(targets),
+                                                args.max_attempts)
+        seed, cached = maze.seed, False
+        result = {**_render(maze, args.cell_size, 3, args.solution, args.answer_key,
+                            args.format, args.dpi, args.page),
+                  'metrics': maze.metrics}
+        print(f"[Maze] Target {'met' if met else 'not met'} after {attempts} attempts: "
+              f"{maze.metrics}", file=sys.stderr)
+    else:
+        result, cached = render_maze(size, algorithm, seed, args.cell_size,
+                                     show_solution=args.solution, answer_key=args.answer_key,
+                                     cache=cache, fmt=args.format, dpi=args.dpi, page=args.page)
     
+    fmt = args.format
     # 如果指定 --stdout 或没有指定输出文件，则输出到 stdout
     if args.stdout or args.output is None:
-        print(svg)
+        if args.answer_key:
+            print(json.dumps({**_jsonable(result), 'size': size, 'algorithm': algorithm,
+                              'seed': seed}))
+        elif fmt == 'png':
+            sys.stdout.buffer.write(result['png'])
+            sys.stdout.flush()
+        else:
+            print(result['svg'])
     else:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(svg)
+        outputs = [(args.output, result[fmt])]
+        if args.answer_key:
+            base, ext = os.path.splitext(args.output)
+            outputs.append((f'{base}_solution{ext or "." + fmt}', result[f'solution_{fmt}']))
+        for path, data in outputs:
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(data)
         
-        import sys
         print(f"[Maze] Generated: {args.output}", file=sys.stderr)
         print(f"   - Size: {size} x {size}", file=sys.stderr)
         print(f"   - Difficulty: {args.difficulty}", file=sys.stderr)
         print(f"   - Algorithm: {algorithm}", file=sys.stderr)
-        if args.solution:
-            print(f"   - Solution: shown", file=sys.stderr)
+        print(f"   - Seed: {seed}{' (cached)' if cached else ''}", file=sys.stderr)
+        if args.answer_key:
+            print(f"   - Answer key: {outputs[1][0]}", file=sys.stderr)
+        elif args.solution:
+            print("   - Solution: shown", file=sys.stderr)
 
 
 if __name__ == '__main__':
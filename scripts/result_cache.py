@@ -0,0 +1,98 @@
+"""
+磁盘结果缓存
+以参数哈希为键保存渲染结果，按文件修改时间做 LRU 淘汰，总大小不超过 max_bytes。
+写入先落临时文件再 os.replace，多个进程可以安全共享同一个缓存目录。
+
+使用方法:
+    cache = ResultCache('/tmp/maze-cache', max_bytes=64 * 1024 * 1024)
+    key = ResultCache.make_key('maze', 1, 22, 'dfs', 42)
+    data = cache.get(key)
+    if data is None:
+        data = render()
+        cache.put(key, data)
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from typing import Optional
+
+
+class ResultCache:
+    """内容寻址的磁盘缓存（LRU 容量淘汰）"""
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, suffix: str = '.bin'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """把参数序列化后取 SHA-256 作为缓存键"""
+        raw = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """命中时返回内容并刷新修改时间（作为最近使用时间）"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """原子写入，写入后按需淘汰最久未使用的条目"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # 缓存写失败不影响正常结果
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}